@@ -0,0 +1,122 @@
+import json
+from sqlalchemy import bindparam, insert, text
+from . import catalog_cache, thumbnails
+from .fulltext import IS_POSTGRES
+from .models import Act, Venue
+from .tags import write_tags
+
+# Set-based moderation of provider submissions.
+# approve_submissions handles any number of ids with a fixed number of
+# statements per batch: one SELECT for the submissions, one thumbnail lookup,
+# one multi-row INSERT ... RETURNING per catalog table, one tag write and one
+# UPDATE marking the batch approved. Every id gets an outcome.
+
+BATCH = 1000
+
+def _ids_clause(sql):
+    """`sql` with `:ids` matched as = ANY(array) on Postgres, expanding IN elsewhere."""
+    if IS_POSTGRES:
+        return text(sql.replace("IN :ids", "= ANY(:ids)"))
+    return text(sql).bindparams(bindparam("ids", expanding=True))
+
+_NO_THUMBS = {"thumb_url": None, "thumb_srcset": None}
+
+def _act_values(payload, thumbs):
+    image_url = payload.get("image_url") or ""
+    return {
+        "name": payload.get("name", ""),
+        "location": payload.get("location", ""),
+        "act_type": payload.get("act_type", "Entertainment"),
+        "genres": payload.get("genres") or payload.get("genre", ""),
+        "price_from": payload.get("price_from"),
+        "description": payload.get("description", ""),
+        "rating": None, "featured": False, "premium": False,
+        "image_url": image_url,
+        **thumbs.get(image_url, _NO_THUMBS),
+    }
+
+def _venue_values(payload, thumbs):
+    image_url = payload.get("image_url") or ""
+    return {
+        "name": payload.get("name", ""),
+        "location": payload.get("location", ""),
+        "capacity": payload.get("capacity"),
+        "price_from": payload.get("price_from"),
+        "style": payload.get("style", ""),
+        "amenities": payload.get("amenities", ""),
+        "featured": False, "premium": False,
+        "image_url": image_url,
+        **thumbs.get(image_url, _NO_THUMBS),
+    }
+
+def _insert(db, model, rows):
+    """Multi-row INSERT returning the new ids in the same order as `rows`."""
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.execute(stmt, rows).scalars())
+
+def _approve_batch(db, ids, results):
+    found = db.execute(_ids_clause(
+        "SELECT id, role, payload_json, status FROM submissions WHERE id IN :ids"
+    ), {"ids": ids}).all()
+    pending = []
+    for sid, role, payload_json, status in found:
+        if status == "approved":
+            results[sid] = {"submission_id": sid, "status": "skipped", "error": "already approved"}
+            continue
+        try:
+            payload = json.loads(payload_json or "{}")
+            if not isinstance(payload, dict):
+                raise ValueError
+        except ValueError:
+            results[sid] = {"submission_id": sid, "status": "error", "error": "invalid payload"}
+            continue
+        pending.append((sid, "act" if (role or "").lower() == "act" else "venue", payload))
+    if not pending:
+        return 0
+
+    thumbs = thumbnails.images_fields(db, [p.get("image_url") for _, _, p in pending])
+    acts = [(sid, _act_values(p, thumbs)) for sid, kind, p in pending if kind == "act"]
+    venues = [(sid, _venue_values(p, thumbs)) for sid, kind, p in pending if kind == "venue"]
+    act_ids = _insert(db, Act, [v for _, v in acts])
+    venue_ids = _insert(db, Venue, [v for _, v in venues])
+    write_tags(db, {aid: v["genres"] for aid, (_, v) in zip(act_ids, acts)})
+
+    # rows whose image has no variants yet get them once this transaction commits
+    missing = {}
+    for table, batch, new_ids in (("acts", acts, act_ids), ("venues", venues, venue_ids)):
+        for (_, v), new_id in zip(batch, new_ids):
+            if v["image_url"] and not v["thumb_url"]:
+                missing.setdefault(v["image_url"], []).append((table, new_id))
+    for url, targets in missing.items():
+        thumbnails.submit_after_commit(db, url, targets)
+
+    for kind, batch, new_ids in (("act", acts, act_ids), ("venue", venues, venue_ids)):
+        for (sid, _), new_id in zip(batch, new_ids):
+            results[sid] = {"submission_id": sid, "status": "approved", "type": kind, "id": new_id}
+    db.execute(_ids_clause("UPDATE submissions SET status = 'approved' WHERE id IN :ids"),
+               {"ids": [sid for sid, _, _ in pending]})
+    return len(pending)
+
+def approve_submissions(db, ids):
+    """
+    Approve submissions into acts/venues. Returns (approved count, per-id results
+    in request order). The caller commits.
+    """
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    results, approved = {}, 0
+    for start in range(0, len(ids), BATCH):
+        approved += _approve_batch(db, ids[start:start + BATCH], results)
+    if approved:
+        catalog_cache.bump(db)
+    return approved, [results.get(i, {"submission_id": i, "status": "not_found"}) for i in ids]
+
+def reject_submissions(db, ids):
+    ids = list(dict.fromkeys(int(i) for i in ids))
+    rejected = set(db.execute(_ids_clause(
+        "UPDATE submissions SET status = 'rejected' WHERE id IN :ids RETURNING id"
+    ), {"ids": ids}).scalars())
+    return len(rejected), [
+        {"submission_id": i, "status": "rejected" if i in rejected else "not_found"} for i in ids
+    ]
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+from fastapi import HTTPException
+from sqlalchemy import and_, exists, false, inspect, text
+from .fulltext import IS_POSTGRES
+from .models import Act, Availability
+
+# Act availability by day.
+# availability holds at most one row per act and day (day is a real DATE; the
+# old string `date` column is kept in step for existing readers). A row with
+# is_available = false blocks that day; no row means available. Catalog
+# filters are NOT EXISTS anti-joins against the blocked rows, answered from
+# ix_availability_blocked / ux_availability_act_day, and enquiries for an act
+# are checked against the same rows.
+
+MAX_RANGE_DAYS = 366
+
+BACKFILL_BATCH = 5000
+
+def _backfill_days(db):
+    """day from the legacy string column, parsed with parse_day so bad values (2026-02-30) stay NULL."""
+    after = 0
+    while True:
+        rows = db.execute(text("""
+            SELECT id, date FROM availability WHERE day IS NULL AND id > :after ORDER BY id LIMIT :n
+        """), {"after": after, "n": BACKFILL_BATCH}).all()
+        if not rows:
+            return
+        after = rows[-1][0]
+        days = [{"id": row_id, "day": d} for row_id, value in rows if (d := parse_day(value))]
+        if days:
+            db.execute(text("UPDATE availability SET day = :day WHERE id = :id"), days)
+
+def ensure_availability_table(db):
+    """Table + indexes. The day backfill and the dedupe run only when the day column / unique index are first added."""
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS availability (
+            id SERIAL PRIMARY KEY,
+            act_id INTEGER REFERENCES acts(id),
+            date VARCHAR(20) NOT NULL,
+            is_available BOOLEAN DEFAULT TRUE
+        )
+    """))
+    insp = inspect(db.connection())
+    if "day" not in {c["name"] for c in insp.get_columns("availability")}:
+        # IF NOT EXISTS: another instance booting at the same time may add it first
+        db.execute(text(f"ALTER TABLE availability ADD COLUMN {'IF NOT EXISTS ' if IS_POSTGRES else ''}day DATE"))
+        _backfill_days(db)
+    if "ux_availability_act_day" not in {ix["name"] for ix in insp.get_indexes("availability")}:
+        # one row per act and day: the latest entry wins
+        if IS_POSTGRES:
+            db.execute(text("""
+                DELETE FROM availability a USING availability b
+                WHERE a.act_id = b.act_id AND a.day = b.day AND a.id < b.id
+            """))
+        else:
+            db.execute(text("""
+                DELETE FROM availability WHERE day IS NOT NULL AND id NOT IN (
+                    SELECT MAX(id) FROM availability WHERE day IS NOT NULL GROUP BY act_id, day
+                )
+            """))
+        db.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_availability_act_day ON availability (act_id, day)"))
+    db.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_availability_blocked ON availability (day, act_id) WHERE is_available = false
+    """))
+
+def parse_day(value):
+    """ISO yyyy-mm-dd string -> date, or None if it isn't one."""
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+def date_range(available_on=None, available_between=None):
+    """(start, end) from the available_on / available_between ("start,end") filters, or None."""
+    if available_on is not None:
+        return available_on, available_on
+    if not available_between:
+        return None
+    parts = [parse_day(p) for p in available_between.split(",")]
+    if len(parts) != 2 or None in parts or parts[0] > parts[1]:
+        raise HTTPException(400, "available_between must be start,end (yyyy-mm-dd, start <= end)")
+    if (parts[1] - parts[0]).days >= MAX_RANGE_DAYS:
+        raise HTTPException(400, f"available_between spans more than {MAX_RANGE_DAYS} days")
+    return parts[0], parts[1]
+
+def free_between(start, end):
+    """Filter clause: acts with no blocked day in [start, end]."""
+    return ~exists().where(and_(
+        Availability.act_id == Act.id,
+        Availability.day.between(start, end),
+        Availability.is_available == false(),
+    ))
+
+def set_availability(db, act_id, start, end=None, is_available=True):
+    """Upsert one row per day in [start, end]. The caller commits."""
+    end = end or start
+    days = (end - start).days + 1
+    if days < 1 or days > MAX_RANGE_DAYS:
+        raise HTTPException(400, f"Date range must cover 1 to {MAX_RANGE_DAYS} days")
+    rows = [{"act_id": act_id, "day": d, "date": d.isoformat(), "ok": is_available}
+            for d in (start + timedelta(days=i) for i in range(days))]
+    db.execute(text("""
+        INSERT INTO availability (act_id, day, date, is_available) VALUES (:act_id, :day, :date, :ok)
+        ON CONFLICT (act_id, day) DO UPDATE SET is_available = EXCLUDED.is_available, date = EXCLUDED.date
+    """), rows)
+    return days
+
+def check_bookable(db, act_id, day):
+    """409 if the act has blocked `day`. Dates that aren't ISO days are not checked."""
+    day = parse_day(day) if isinstance(day, str) else day
+    if not act_id or day is None:
+        return
+    blocked = db.query(Availability.id).filter(
+        Availability.act_id == act_id, Availability.day == day, Availability.is_available == false(),
+    ).first()
+    if blocked:
+        raise HTTPException(409, "The act is not available on that date")
@@ -0,0 +1,179 @@
+import os, threading, time
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from .models import Act, Venue
+from .serializers import act_card, venue_card, card_options, dumps, json_array
+from .tags import split_genres
+from .pagination import ACT_SORT, VENUE_SORT, DEFAULT_LIMIT, MAX_LIMIT, encode_cursor, decode_cursor
+
+# Per-worker catalog snapshot.
+# Public catalog listings are served from an in-memory, pre-sorted copy of the
+# acts/venues tables (card columns only). Detail payloads are cached in the
+# snapshot as they are first requested (detail()), so they go away with it;
+# ids the snapshot doesn't know about and oversized payloads (inline data:
+# images) always read the database. Every write path that changes the catalog
+# calls bump(db), which increments catalog_version.version inside the writer's
+# transaction.
+# Readers compare their snapshot's version against that row at most every
+# CATALOG_CACHE_CHECK seconds (so other workers pick up changes quickly) and
+# the writing worker drops its snapshot as soon as the commit lands.
+# A snapshot is also rebuilt after CATALOG_CACHE_TTL seconds regardless, and
+# tables larger than CATALOG_CACHE_MAX_ROWS are never cached (callers fall
+# back to SQL).
+
+ENABLED = os.getenv("CATALOG_CACHE", "1") != "0"
+TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CHECK_INTERVAL = float(os.getenv("CATALOG_CACHE_CHECK", "2"))
+MAX_ROWS = int(os.getenv("CATALOG_CACHE_MAX_ROWS", "5000"))
+DETAIL_MAX_BYTES = 64 * 1024
+
+def ensure_version_table(db):
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """))
+    db.execute(text("INSERT INTO catalog_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"))
+
+def current_version(db):
+    row = db.execute(text("SELECT version FROM catalog_version WHERE id = 1")).first()
+    return row[0] if row else 0
+
+def bump(db):
+    """Mark the catalog as changed. Call inside the write transaction, before commit."""
+    db.execute(text("UPDATE catalog_version SET version = version + 1 WHERE id = 1"))
+    event.listen(db, "after_commit", lambda session: invalidate(), once=True)
+
+def invalidate():
+    acts.invalidate()
+    venues.invalidate()
+
+class Snapshot:
+    def __init__(self, version, rows, key, key_size):
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+        # rows are sorted in listing order; key(row) gives the cursor tuple
+        self.key = key
+        self.key_size = key_size
+        self.rows = sorted(rows, key=key, reverse=True)
+        # each card pre-encoded once, so responses are a bytes join
+        self.encoded = {r["id"]: dumps(r) for r in self.rows}
+        self.details = {}  # id -> encoded detail payload, filled on demand
+
+    def encode(self, rows):
+        """JSON array (serializers.Raw) of snapshot rows."""
+        return json_array([self.encoded[r["id"]] for r in rows])
+
+    def filter(self, contains=None, ranges=None, equals=None, tags=None):
+        """
+        Same semantics as the SQL filters: NULL never matches an active filter.
+        tags maps a comma-separated field to (wanted, "any"|"all"), like tags.genre_filter.
+        """
+        checks = []
+        for field, (wanted, match) in (tags or {}).items():
+            wanted = set(split_genres(wanted))
+            if wanted:
+                test = wanted.issubset if match == "all" else wanted.intersection
+                checks.append(lambda r, f=field, t=test: bool(t(split_genres(r.get(f)))))
+        for field, value in (contains or {}).items():
+            if value:
+                needle = value.lower()
+                checks.append(lambda r, f=field, n=needle: n in (r.get(f) or "").lower())
+        for field, (lo, hi) in (ranges or {}).items():
+            if lo is not None:
+                checks.append(lambda r, f=field, lo=lo: r.get(f) is not None and r[f] >= lo)
+            if hi is not None:
+                checks.append(lambda r, f=field, hi=hi: r.get(f) is not None and r[f] <= hi)
+        for field, value in (equals or {}).items():
+            if value is not None:
+                checks.append(lambda r, f=field, v=value: r.get(f) == v)
+        if not checks:
+            return self.rows
+        return [r for r in self.rows if all(c(r) for c in checks)]
+
+    def page(self, rows, limit=None, cursor=None):
+        """Keyset page over already-filtered rows; cursors are interchangeable with pagination.paginate."""
+        limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+        if cursor:
+            after = tuple(decode_cursor(cursor, self.key_size))
+            try:
+                rows = [r for r in rows if self.key(r) < after]
+            except TypeError:
+                raise HTTPException(400, "Invalid cursor")
+        items = rows[:limit]
+        next_cursor = encode_cursor(self.key(items[-1])) if len(rows) > limit else None
+        return items, next_cursor
+
+class CatalogCache:
+    def __init__(self, model, serialize, key, key_size):
+        self.model = model
+        self.serialize = serialize
+        self.key = key
+        self.key_size = key_size
+        self._snapshot = None
+        self._too_big_until = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def get(self, db):
+        """Current snapshot, rebuilding if stale. None means: query the database."""
+        if not ENABLED:
+            return None
+        snap = self._snapshot
+        now = time.monotonic()
+        if now < self._too_big_until:
+            return None
+        if snap is not None and now - snap.built_at < TTL:
+            if now - snap.checked_at < CHECK_INTERVAL:
+                return snap
+            if current_version(db) == snap.version:
+                snap.checked_at = now
+                return snap
+        # Never wait for a rebuild in progress: async handlers share the event
+        # loop thread (see db.run_db), so blocking here could deadlock. Callers
+        # fall back to SQL until the new snapshot is in place.
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if self._snapshot is not None and self._snapshot is not snap:
+                return self._snapshot  # another request rebuilt it meanwhile
+            version = current_version(db)
+            rows = db.query(self.model).options(*card_options(self.model)).limit(MAX_ROWS + 1).all()
+            if len(rows) > MAX_ROWS:
+                self._snapshot = None
+                self._too_big_until = now + TTL
+                return None
+            self._snapshot = Snapshot(version, [self.serialize(r) for r in rows], self.key, self.key_size)
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def detail(self, db, row_id, load):
+        """
+        Encoded detail payload for row_id, or None if there is no such row.
+        Served from the current snapshot when cached there, else load(db, row_id)
+        (a dict or None), which is kept for the snapshot's lifetime.
+        """
+        snap = self.get(db)
+        if snap is not None and row_id in snap.details:
+            return snap.details[row_id]
+        d = load(db, row_id)
+        if d is None:
+            return None
+        body = dumps(d)
+        if snap is not None and row_id in snap.encoded and len(body) <= DETAIL_MAX_BYTES:
+            snap.details[row_id] = body
+        return body
+
+# Python mirrors of pagination.ACT_SORT / VENUE_SORT (all descending)
+def _act_key(r):
+    return (bool(r.get("premium")), bool(r.get("featured")), r.get("rating") or 0, r["id"])
+
+def _venue_key(r):
+    return (bool(r.get("premium")), bool(r.get("featured")), r["id"])
+
+acts = CatalogCache(Act, act_card, _act_key, len(ACT_SORT))
+venues = CatalogCache(Venue, venue_card, _venue_key, len(VENUE_SORT))
@@ -0,0 +1,193 @@
+import codecs, csv, json, os, re, time
+from pydantic import ValidationError
+from sqlalchemy import text
+from . import catalog_cache
+from .fulltext import IS_POSTGRES
+from .schemas import ActBase, VenueBase
+from .tags import write_tags
+
+# Bulk catalog import (supplier CSV / JSON Lines files).
+# Rows are read as a stream and validated IMPORT_CHUNK_ROWS at a time with the
+# ActBase / VenueBase schemas. Each valid chunk is loaded into a temporary
+# staging table (COPY on Postgres, executemany elsewhere), then applied with
+# one UPDATE ... FROM for slugs that already exist and one INSERT ... SELECT
+# for new ones, and committed. Rows without a slug get one from their name;
+# on re-import, columns left empty keep their current value. Invalid rows are
+# counted and reported with their line number, up to MAX_ERRORS of them.
+#
+#   python -m app.catalog_import acts suppliers/acts.csv
+#   python -m app.catalog_import venues venues.jsonl --format jsonl
+
+CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(200 * 1024 * 1024)))
+MAX_ERRORS = 100
+STAGE = "catalog_import_stage"
+
+KINDS = {"acts": ActBase, "venues": VenueBase}
+# Only set when the row doesn't give a value, and only for new rows
+INSERT_DEFAULTS = {"featured": "false", "premium": "false"}
+
+def _index_exists(db, name):
+    # catalog lookup rather than inspect(): that can't reflect the expression
+    # indexes on these tables and warns about them
+    if IS_POSTGRES:
+        return db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    return db.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"),
+                      {"name": name}).first() is not None
+
+def ensure_import_indexes(db):
+    """
+    Unique slug indexes the upsert-on-slug joins use (same names SQLAlchemy
+    gives the models' index). Tables that have it already are not scanned;
+    otherwise it's skipped with a warning while the table still has duplicate
+    slugs, so a dirty table can't fail startup (imports then still work, just
+    without the index).
+    """
+    for table in KINDS:
+        if _index_exists(db, f"ix_{table}_slug"):
+            continue
+        dupes = db.execute(text(f"""
+            SELECT slug FROM {table} WHERE slug IS NOT NULL GROUP BY slug HAVING COUNT(*) > 1 LIMIT 5
+        """)).scalars().all()
+        if dupes:
+            print(f"⚠️  Not creating ix_{table}_slug: duplicate slugs in {table} (e.g. {', '.join(dupes)})")
+            continue
+        db.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_slug ON {table} (slug)"))
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "-", (value or "").lower()).strip("-")
+
+def read_records(lines, fmt="csv"):
+    """(line number, dict) for each record of a CSV (with header) or JSON Lines stream."""
+    if fmt == "jsonl":
+        for n, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield n, record
+    else:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, {k: (v if v != "" else None) for k, v in record.items() if k}
+
+def _validate(schema, n, record, report):
+    try:
+        if not isinstance(record, dict):
+            raise ValueError("not a JSON object")
+        row = schema.model_validate(record).model_dump(exclude_unset=True)
+    except (ValidationError, ValueError) as e:
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_ERRORS:
+            if isinstance(e, ValidationError):
+                errors = [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()]
+            else:
+                errors = [str(e)]
+            report["errors"].append({"line": n, "errors": errors})
+        return None
+    row["slug"] = slugify(row.get("slug") or row["name"])
+    if not row["slug"]:
+        report["rejected"] += 1
+        if len(report["errors"]) < MAX_ERRORS:
+            report["errors"].append({"line": n, "errors": ["slug: could not derive a slug from name"]})
+        return None
+    return row
+
+def _stage(db, table, columns, rows):
+    db.execute(text(f"DROP TABLE IF EXISTS {STAGE}"))
+    db.execute(text(f"CREATE TEMP TABLE {STAGE} AS SELECT {', '.join(columns)} FROM {table} WHERE 1 = 0"))
+    values = [tuple(r.get(c) for c in columns) for r in rows]
+    if IS_POSTGRES:
+        cur = db.connection().connection.cursor()
+        try:
+            with cur.copy(f"COPY {STAGE} ({', '.join(columns)}) FROM STDIN") as copy:
+                for v in values:
+                    copy.write_row(v)
+        finally:
+            cur.close()
+    else:
+        placeholders = ", ".join(f":{c}" for c in columns)
+        db.execute(text(f"INSERT INTO {STAGE} VALUES ({placeholders})"), [dict(zip(columns, v)) for v in values])
+
+def _apply(db, table, columns):
+    """Upsert staged rows on slug. Returns (updated, inserted)."""
+    data = [c for c in columns if c != "slug"]
+    updated = db.execute(text(f"""
+        UPDATE {table} SET {', '.join(f'{c} = COALESCE(s.{c}, {table}.{c})' for c in data)}
+        FROM {STAGE} s WHERE {table}.slug = s.slug
+    """)).rowcount
+    select_list = ", ".join(
+        f"COALESCE(s.{c}, {INSERT_DEFAULTS[c]})" if c in INSERT_DEFAULTS else f"s.{c}" for c in columns
+    )
+    inserted = db.execute(text(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {select_list} FROM {STAGE} s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.slug = s.slug)
+        ON CONFLICT DO NOTHING
+    """)).rowcount
+    return updated, inserted
+
+def _load_chunk(db, kind, rows, report):
+    columns = list(KINDS[kind].model_fields)
+    rows = list({r["slug"]: r for r in rows}.values())  # last row wins within a chunk
+    _stage(db, kind, columns, rows)
+    updated, inserted = _apply(db, kind, columns)
+    if kind == "acts":
+        staged = db.execute(text(f"""
+            SELECT a.id, a.genres FROM acts a JOIN {STAGE} s ON s.slug = a.slug WHERE s.genres IS NOT NULL
+        """)).all()
+        write_tags(db, {act_id: genres for act_id, genres in staged}, replace=True)
+    db.execute(text(f"DROP TABLE IF EXISTS {STAGE}"))
+    catalog_cache.bump(db)
+    db.commit()
+    report["updated"] += updated
+    report["inserted"] += inserted
+
+def import_catalog(db, kind, lines, fmt="csv", chunk_rows=CHUNK_ROWS):
+    """
+    Import acts or venues from an iterable of text lines. Commits per chunk,
+    so rows in chunks before a failure stay imported.
+    Returns {"kind", "rows", "inserted", "updated", "rejected", "errors", "seconds", "rows_per_sec"}.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown catalog kind {kind!r}")
+    schema = KINDS[kind]
+    report = {"kind": kind, "rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "errors": []}
+    started = time.perf_counter()
+    chunk = []
+    for n, record in read_records(lines, fmt):
+        report["rows"] += 1
+        row = _validate(schema, n, record, report)
+        if row is not None:
+            chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            _load_chunk(db, kind, chunk, report)
+            chunk = []
+    if chunk:
+        _load_chunk(db, kind, chunk, report)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    report["rows_per_sec"] = round(report["rows"] / report["seconds"]) if report["seconds"] else report["rows"]
+    return report
+
+def import_file(db, kind, fileobj, fmt="csv"):
+    """import_catalog over a binary file object (UTF-8, optional BOM)."""
+    return import_catalog(db, kind, codecs.getreader("utf-8-sig")(fileobj), fmt)
+
+if __name__ == "__main__":
+    import argparse
+    from .db import SessionLocal
+    parser = argparse.ArgumentParser(prog="python -m app.catalog_import", description="Bulk import acts or venues")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    args = parser.parse_args()
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    with SessionLocal() as db, open(args.path, "rb") as f:
+        ensure_import_indexes(db)
+        db.commit()
+        report = import_file(db, args.kind, f, fmt)
+    for err in report["errors"]:
+        print(f"⚠️  line {err['line']}: {'; '.join(err['errors'])}")
+    print(f"✅ {report['kind']}: {report['rows']} rows, {report['inserted']} inserted, {report['updated']} updated, "
+          f"{report['rejected']} rejected in {report['seconds']}s ({report['rows_per_sec']} rows/s)")
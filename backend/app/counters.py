@@ -0,0 +1,219 @@
+import hashlib, os, threading
+from sqlalchemy import text
+from .db import SessionLocal
+from .fulltext import IS_POSTGRES
+
+# Maintained counters behind /admin/summary.
+# On Postgres, statement-level triggers on acts, venues, bookings, reviews and
+# submissions keep summary_counters up to date inside each writer's
+# transaction (so every write path is covered, including raw SQL and COPY),
+# and add the statement's inserts to daily_counters for the per-day
+# breakdown. Each trigger counts its statement's transition table, so a bulk
+# INSERT or COPY touches the counters once, not once per row. Both tables are
+# sharded into COUNTERS_SLOTS rows picked by backend pid, so concurrent writers
+# on different connections don't queue on one row; reads sum the slots.
+# reconcile() corrects drift against COUNT(*) without blocking writers; it runs
+# at startup and every COUNTERS_RECONCILE_SECONDS in a background thread (one
+# worker at a time, via an advisory lock). Other databases count directly.
+#
+# Startup DDL is idempotent and lock-free when nothing changed: the trigger
+# function carries a version comment and is only replaced when it differs, and
+# triggers are only created when missing (CREATE/DROP TRIGGER lock the table).
+
+RECONCILE_SECONDS = float(os.getenv("COUNTERS_RECONCILE_SECONDS", "3600"))
+SLOTS = max(1, int(os.getenv("COUNTERS_SLOTS", "8")))
+NAMES = ("acts", "venues", "bookings", "pending_reviews", "pending_submissions")
+TABLES = ("acts", "venues", "bookings", "reviews", "submissions")
+_LOCK_KEY = 7220  # pg advisory lock id for reconcile
+_DDL_LOCK_KEY = 7221  # and for ensure_counter_tables, so booting instances don't race on CREATE TRIGGER
+
+_COUNT_SQL = {
+    "acts": "SELECT COUNT(*) FROM acts",
+    "venues": "SELECT COUNT(*) FROM venues",
+    "bookings": "SELECT COUNT(*) FROM bookings",
+    "pending_reviews": "SELECT COUNT(*) FROM reviews WHERE status = 'pending'",
+    "pending_submissions": "SELECT COUNT(*) FROM submissions WHERE status = 'pending'",
+}
+
+# reviews/submissions count rows in status 'pending'; the other tables count all
+# rows. new_rows / old_rows are the statement's transition tables.
+_TRIGGER_FN = """
+CREATE OR REPLACE FUNCTION vh_count_rows() RETURNS trigger AS $$
+DECLARE
+    pending boolean := TG_TABLE_NAME IN ('reviews', 'submissions');
+    col text := CASE WHEN pending THEN 'pending_' || TG_TABLE_NAME ELSE TG_TABLE_NAME END;
+    filter text := CASE WHEN pending THEN ' WHERE status = ''pending''' ELSE '' END;
+    slot integer := 1 + pg_backend_pid() % @SLOTS@;
+    added bigint := 0;
+    removed bigint := 0;
+    inserted bigint;
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE 'SELECT COUNT(*) FROM new_rows' || filter INTO added;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE 'SELECT COUNT(*) FROM old_rows' || filter INTO removed;
+    END IF;
+    IF added <> removed THEN
+        EXECUTE format('UPDATE summary_counters SET %I = %I + $1 WHERE id = $2', col, col) USING added - removed, slot;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        IF pending THEN
+            EXECUTE 'SELECT COUNT(*) FROM new_rows' INTO inserted;
+        ELSE
+            inserted := added;
+        END IF;
+        IF inserted > 0 THEN
+            INSERT INTO daily_counters (day, name, slot, value) VALUES (CURRENT_DATE, TG_TABLE_NAME, slot, inserted)
+            ON CONFLICT (day, name, slot) DO UPDATE SET value = daily_counters.value + EXCLUDED.value;
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+""".replace("@SLOTS@", str(SLOTS))
+_FN_VERSION = "vh_count_rows " + hashlib.sha1(_TRIGGER_FN.encode()).hexdigest()[:12]
+
+# event -> transition tables; one trigger per event (UPDATE OF <column> can't
+# have transition tables, so status changes are found by comparing counts)
+_EVENTS = {
+    "insert": "INSERT REFERENCING NEW TABLE AS new_rows",
+    "delete": "DELETE REFERENCING OLD TABLE AS old_rows",
+    "update": "UPDATE REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+}
+
+def _triggers():
+    """{(table, trigger name): event} this module maintains."""
+    return {
+        (table, f"vh_count_{table}_{event}"): event
+        for table in TABLES
+        for event in (("insert", "delete", "update") if table in ("reviews", "submissions") else ("insert", "delete"))
+    }
+
+def ensure_counter_tables(db):
+    """Counter tables, function and triggers (Postgres only); totals are filled by reconcile()."""
+    if not IS_POSTGRES:
+        return
+    db.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _DDL_LOCK_KEY})
+    db.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS summary_counters (
+            id INTEGER PRIMARY KEY,
+            {', '.join(f'{n} BIGINT NOT NULL DEFAULT 0' for n in NAMES)},
+            reconciled_at TIMESTAMP
+        )
+    """))
+    # one row per slot; row 1 also holds the reconciled corrections
+    db.execute(text("""
+        INSERT INTO summary_counters (id) SELECT generate_series(1, :slots) ON CONFLICT (id) DO NOTHING
+    """), {"slots": SLOTS})
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS daily_counters (
+            day DATE NOT NULL,
+            name VARCHAR(40) NOT NULL,
+            slot INTEGER NOT NULL DEFAULT 1,
+            value BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, name, slot)
+        )
+    """))
+    if not db.execute(text("""
+        SELECT 1 FROM information_schema.columns WHERE table_name = 'daily_counters' AND column_name = 'slot'
+    """)).first():
+        # tables from before slots: key (day, name) -> (day, name, slot)
+        db.execute(text("ALTER TABLE daily_counters ADD COLUMN slot INTEGER NOT NULL DEFAULT 1"))
+        db.execute(text("ALTER TABLE daily_counters DROP CONSTRAINT daily_counters_pkey"))
+        db.execute(text("ALTER TABLE daily_counters ADD PRIMARY KEY (day, name, slot)"))
+
+    current = db.execute(text("SELECT obj_description(to_regprocedure('vh_count_rows()'), 'pg_proc')")).scalar()
+    if current != _FN_VERSION:
+        db.execute(text(_TRIGGER_FN))
+        db.execute(text(f"COMMENT ON FUNCTION vh_count_rows() IS '{_FN_VERSION}'"))
+
+    wanted = _triggers()
+    existing = set(db.execute(text("""
+        SELECT c.relname, t.tgname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid
+        WHERE NOT t.tgisinternal AND t.tgname LIKE 'vh\\_count\\_%'
+    """)).all())
+    for table, name in existing - set(wanted):
+        if table in TABLES:  # e.g. the old row-level vh_count_<table>
+            db.execute(text(f"DROP TRIGGER IF EXISTS {name} ON {table}"))
+    for (table, name), event in wanted.items():
+        if (table, name) not in existing:
+            db.execute(text(f"""
+                CREATE TRIGGER {name} AFTER {_EVENTS[event]} ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION vh_count_rows()
+            """))
+
+def reconcile(db):
+    """
+    Correct the totals against COUNT(*). The counts and the slot sums are
+    read in one statement, i.e. one snapshot, so their difference is exactly
+    the drift; it is then added to row 1 in a short UPDATE on top of whatever
+    deltas writers committed meanwhile, so writers never wait behind the
+    counts. Returns False if another worker is already reconciling.
+    """
+    if not IS_POSTGRES:
+        return False
+    if not db.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+        return False
+    drift = db.execute(text(f"""
+        SELECT {', '.join(f'({_COUNT_SQL[n]}) - COALESCE(SUM({n}), 0) AS {n}' for n in NAMES)} FROM summary_counters
+    """)).mappings().first()
+    db.execute(text(f"""
+        UPDATE summary_counters SET {', '.join(f'{n} = {n} + :{n}' for n in NAMES)}, reconciled_at = NOW()
+        WHERE id = 1
+    """), dict(drift))
+    return True
+
+def summary(db, days=0):
+    """Totals summed over the counter slots (COUNT(*)s off Postgres), plus `days` of daily inserts."""
+    row = None
+    if IS_POSTGRES:
+        row = db.execute(text(f"SELECT {', '.join(f'SUM({n})' for n in NAMES)} FROM summary_counters")).first()
+        if row is not None and row[0] is None:  # no counter rows
+            row = None
+    if row is None:
+        row = [db.execute(text(_COUNT_SQL[n])).scalar() for n in NAMES]
+    result = dict(zip(NAMES, (int(v) for v in row)))
+    if days and IS_POSTGRES:
+        daily = {}
+        for day, name, value in db.execute(text("""
+            SELECT day, name, SUM(value) FROM daily_counters
+            WHERE day > CURRENT_DATE - CAST(:days AS INTEGER) GROUP BY day, name ORDER BY day DESC
+        """), {"days": days}):
+            daily.setdefault(day, {"day": day.isoformat(), **{t: 0 for t in TABLES}})[name] = int(value)
+        result["daily"] = list(daily.values())
+    return result
+
+def reconcile_now():
+    with SessionLocal() as db:
+        done = reconcile(db)
+        db.commit()
+    return done
+
+_stop = threading.Event()
+_thread = None
+
+def _loop():
+    while not _stop.wait(RECONCILE_SECONDS):
+        try:
+            reconcile_now()
+        except Exception as e:
+            print(f"⚠️  counter reconcile failed: {e}")
+
+def start():
+    """Reconcile once, then keep reconciling in the background (Postgres only)."""
+    global _thread
+    if not IS_POSTGRES:
+        return
+    reconcile_now()
+    if RECONCILE_SECONDS > 0 and _thread is None:
+        _stop.clear()
+        _thread = threading.Thread(target=_loop, name="counters-reconcile", daemon=True)
+        _thread.start()
+
+def shutdown():
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
@@ -1,6 +1,11 @@
-﻿import os
-from sqlalchemy import create_engine
+﻿import os, shlex, uuid
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from .pool_metrics import timed_pool
+from .read_routing import use_primary
 
 # --- Database URL (Railway/Env) ---
 # Try common env var names; fail clearly if none present.
@@ -14,8 +19,45 @@ DATABASE_URL = (
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
+# --- Connection pool (env) ---
+# DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT (s) / DB_POOL_RECYCLE (s)
+# size each engine's pool; DB_STATEMENT_TIMEOUT_MS caps every statement
+# server-side (0 = off). DB_EXTERNAL_POOLER=1 is for PgBouncer in transaction
+# mode: no app-side pool (NullPool) and no server-side prepared statements.
+# Startup options don't survive a transaction pooler, so in that mode set
+# statement_timeout on the database role instead.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+EXTERNAL_POOLER = os.getenv("DB_EXTERNAL_POOLER", "0") == "1"
+
+def _pool_kwargs(base):
+    if EXTERNAL_POOLER:
+        return {"poolclass": timed_pool(NullPool)}
+    return {
+        "poolclass": timed_pool(base),
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _connect_args(url):
+    if url.get_backend_name() != "postgresql":
+        return {}
+    args = {}
+    if STATEMENT_TIMEOUT_MS and not EXTERNAL_POOLER:
+        args["options"] = f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"
+    if EXTERNAL_POOLER and url.get_driver_name() == "psycopg":
+        args["prepare_threshold"] = None
+    return args
+
 # --- SQLAlchemy Core ---
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+engine = create_engine(DATABASE_URL, future=True, connect_args=_connect_args(make_url(DATABASE_URL)),
+                       **_pool_kwargs(QueuePool))
 
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -24,6 +66,191 @@ SessionLocal = sessionmaker(
     future=True,
 )
 
+# --- Read replica (optional) ---
+# READ_DATABASE_URL points read-only endpoints (catalog, reviews, search,
+# media) at a replica via run_read() / ReadSessionLocal; writes and admin
+# stay on the primary. Clients that just wrote are pinned to the primary for
+# a few seconds (see read_routing). Unset, reads use the primary.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+
+if READ_DATABASE_URL:
+    read_engine = create_engine(READ_DATABASE_URL, future=True, connect_args=_connect_args(make_url(READ_DATABASE_URL)),
+                                **_pool_kwargs(QueuePool))
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, future=True)
+else:
+    read_engine, ReadSessionLocal = engine, SessionLocal
+
+def get_db():
+    """Request-scoped session dependency. Shared, so every dependency using it in a request gets the same session."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def read_session():
+    """Session for a read-only request: the replica unless the client is pinned to the primary."""
+    return SessionLocal() if use_primary.get() else ReadSessionLocal()
+
+# --- Async engine (asyncpg) ---
+# Hot read endpoints run through run_db(): on Postgres the (sync) handler body
+# is executed with AsyncSession.run_sync, i.e. in a greenlet on the event loop
+# with asyncpg doing the I/O, so in-flight requests are not capped by the
+# threadpool. ASYNC_DATABASE_URL overrides the derived URL; DB_ASYNC=0 or a
+# non-Postgres database falls back to SessionLocal in the threadpool, and so
+# does an async engine that can't connect at startup (check_async_engines).
+#
+# asyncpg.connect() takes no libpq query parameters, so they are translated:
+# sslmode/sslrootcert/sslcert/sslkey -> ssl, options (-c name=value) and
+# application_name -> server_settings, connect_timeout -> timeout. The ones it
+# understands pass through; anything else (channel_binding, keepalives, ...)
+# is dropped with a warning.
+_ASYNCPG_QUERY = {"host", "port", "passfile", "target_session_attrs"}
+_SSL_QUERY = ("sslmode", "sslrootcert", "sslcert", "sslkey")
+
+def _ssl_arg(query):
+    """libpq ssl* parameters -> asyncpg's ssl= (mode string, or an SSLContext when files are given)."""
+    mode = query.get("sslmode", "prefer")
+    rootcert, cert, key = query.get("sslrootcert"), query.get("sslcert"), query.get("sslkey")
+    if mode == "disable" or not (rootcert or cert):
+        return mode
+    import ssl
+    ctx = ssl.create_default_context(cafile=rootcert)
+    if cert:
+        ctx.load_cert_chain(cert, key)
+    if mode != "verify-full":
+        ctx.check_hostname = False
+    if mode in ("allow", "prefer", "require") and not rootcert:
+        ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+def _server_settings(options):
+    """libpq `options` ("-c a=b -c c=d", "--a=b") -> {"a": "b", "c": "d"}."""
+    settings, tokens = {}, iter(shlex.split(options))
+    for token in tokens:
+        if token == "-c":
+            token = next(tokens, "")
+        elif token.startswith("-c"):
+            token = token[2:]
+        elif token.startswith("--"):
+            token = token[2:].replace("-", "_")
+        else:
+            continue
+        name, sep, value = token.partition("=")
+        if sep:
+            settings[name.strip()] = value
+    return settings
+
+def _asyncpg_connect_args(url):
+    """(url without libpq-only query parameters, asyncpg connect_args)."""
+    query = dict(url.query)
+    connect_args, server_settings = {}, {}
+    if any(k in query for k in _SSL_QUERY):
+        connect_args["ssl"] = _ssl_arg(query)
+    if "options" in query:
+        server_settings.update(_server_settings(query["options"]))
+    if "application_name" in query:
+        server_settings["application_name"] = query["application_name"]
+    if "connect_timeout" in query:
+        connect_args["timeout"] = float(query["connect_timeout"])
+    dropped = sorted(set(query) - _ASYNCPG_QUERY - set(_SSL_QUERY) - {"options", "application_name", "connect_timeout"})
+    if dropped:
+        print(f"⚠️  Async engine ignores DATABASE_URL parameters: {', '.join(dropped)}")
+    if STATEMENT_TIMEOUT_MS and not EXTERNAL_POOLER:
+        server_settings["statement_timeout"] = str(STATEMENT_TIMEOUT_MS)
+    if server_settings:
+        connect_args["server_settings"] = server_settings
+    return url.difference_update_query([k for k in query if k not in _ASYNCPG_QUERY]), connect_args
+
+def _async_engine(url):
+    if os.getenv("DB_ASYNC", "1") == "0":
+        return None
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        return None
+    url, connect_args = _asyncpg_connect_args(url.set(drivername="postgresql+asyncpg"))
+    if EXTERNAL_POOLER:
+        connect_args.update(
+            statement_cache_size=0, prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+        )
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        return create_async_engine(url, connect_args=connect_args, **_pool_kwargs(AsyncAdaptedQueuePool))
+    except ImportError as e:
+        print(f"⚠️  Async engine disabled: {e}")
+        return None
+
+async_engine = _async_engine(os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL)
+async_read_engine = _async_engine(READ_DATABASE_URL) if READ_DATABASE_URL else async_engine
+
+def _async_sessions(engine_):
+    if engine_ is None:
+        return None
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    return async_sessionmaker(engine_, autoflush=False, expire_on_commit=False)
+
+AsyncSessionLocal = _async_sessions(async_engine)
+AsyncReadSessionLocal = AsyncSessionLocal if async_read_engine is async_engine else _async_sessions(async_read_engine)
+
+def pool_stats():
+    """Live pool metrics for each engine (see pool_metrics)."""
+    out = {
+        "config": {
+            "external_pooler": EXTERNAL_POOLER, "pool_size": POOL_SIZE, "max_overflow": MAX_OVERFLOW,
+            "pool_timeout": POOL_TIMEOUT, "pool_recycle": POOL_RECYCLE,
+            "statement_timeout_ms": STATEMENT_TIMEOUT_MS,
+        },
+        "sync": engine.pool.metrics.snapshot(engine.pool),
+    }
+    if async_engine is not None:
+        pool = async_engine.sync_engine.pool
+        out["async"] = pool.metrics.snapshot(pool)
+    if read_engine is not engine:
+        out["read"] = read_engine.pool.metrics.snapshot(read_engine.pool)
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        pool = async_read_engine.sync_engine.pool
+        out["async_read"] = pool.metrics.snapshot(pool)
+    return out
+
+async def _connects(engine_):
+    try:
+        async with engine_.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        print(f"⚠️  Async engine can't connect, using the threadpool instead: {type(e).__name__}: {e}")
+        return False
+
+async def check_async_engines():
+    """Startup check: drop back to the sync/threadpool path for an async engine that can't connect."""
+    global AsyncSessionLocal, AsyncReadSessionLocal
+    if AsyncSessionLocal is not None and not await _connects(async_engine):
+        AsyncSessionLocal = None
+    if async_read_engine is async_engine:
+        AsyncReadSessionLocal = AsyncSessionLocal
+    elif AsyncReadSessionLocal is not None and not await _connects(async_read_engine):
+        AsyncReadSessionLocal = None
+
+async def _run(async_sessions, sessions, fn, args, kwargs):
+    if async_sessions is not None:
+        async with async_sessions() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+    def call():
+        with sessions() as session:
+            return fn(session, *args, **kwargs)
+    return await run_in_threadpool(call)
+
+async def run_db(fn, *args, **kwargs):
+    """Await fn(session, *args, **kwargs) on the async engine, or in the threadpool without one."""
+    return await _run(AsyncSessionLocal, SessionLocal, fn, args, kwargs)
+
+async def run_read(fn, *args, **kwargs):
+    """run_db for read-only work: goes to the replica unless the client is pinned to the primary."""
+    if use_primary.get():
+        return await run_db(fn, *args, **kwargs)
+    return await _run(AsyncReadSessionLocal, ReadSessionLocal, fn, args, kwargs)
+
 # This is what models import:
 Base = declarative_base()
 
@@ -0,0 +1,97 @@
+from collections import Counter
+from sqlalchemy import case, func, literal, literal_column, null
+from .fulltext import IS_POSTGRES
+from .models import Act, ActTag, Tag, Venue
+from .tags import split_genres
+
+# Facet counts for the catalog sidebars.
+# Counts are taken over the current filter set in a single statement:
+# GROUPING SETS on Postgres (one scan), a UNION ALL of per-facet GROUP BYs
+# elsewhere. The catalog snapshot computes the same counts in Python.
+# Genre facet values are tag slugs, i.e. exactly what list_acts' genres= takes.
+
+PRICE_BANDS = [(None, 250, "under-250"), (250, 500, "250-500"), (500, 1000, "500-1000"),
+               (1000, 2500, "1000-2500"), (2500, None, "2500-plus")]
+CAPACITY_BANDS = [(None, 50, "under-50"), (50, 100, "50-100"), (100, 250, "100-250"),
+                  (250, 500, "250-500"), (500, None, "500-plus")]
+
+# facet name -> (row field, bands or None)
+ACT_FACETS = {"location": ("location", None), "act_type": ("act_type", None),
+              "genres": ("genres", None), "price": ("price_from", PRICE_BANDS)}
+VENUE_FACETS = {"location": ("location", None), "style": ("style", None),
+                "price": ("price_from", PRICE_BANDS), "capacity": ("capacity", CAPACITY_BANDS)}
+
+def _band_case(col, bands):
+    # Inline literals (not bind params) so the SELECT and GROUP BY expressions match
+    whens = [(col < literal_column(str(hi)), literal_column(f"'{label}'")) for _, hi, label in bands if hi is not None]
+    return case((col.is_(None), null()), *whens, else_=literal_column(f"'{bands[-1][2]}'"))
+
+def _band_of(value, bands):
+    if value is None:
+        return None
+    for _, hi, label in bands:
+        if hi is None or value < hi:
+            return label
+
+def _format(counts, spec):
+    out = {}
+    for name, (_, bands) in spec.items():
+        c = counts.get(name, {})
+        if bands:
+            out[name] = [{"value": b[2], "count": c[b[2]]} for b in bands if c.get(b[2])]
+        else:
+            out[name] = [{"value": v, "count": n} for v, n in sorted(c.items(), key=lambda kv: (-kv[1], str(kv[0])))]
+    return out
+
+def _columns(model):
+    if model is Act:
+        return {
+            "location": Act.location, "act_type": Act.act_type, "genres": Tag.slug,
+            "price": _band_case(Act.price_from, PRICE_BANDS),
+        }, ACT_FACETS
+    return {
+        "location": Venue.location, "style": Venue.style,
+        "price": _band_case(Venue.price_from, PRICE_BANDS),
+        "capacity": _band_case(Venue.capacity, CAPACITY_BANDS),
+    }, VENUE_FACETS
+
+def sql_facets(query, model):
+    """Facet counts for an already-filtered ORM query over `model` (no ORDER BY/LIMIT)."""
+    cols, spec = _columns(model)
+    base = query
+    if model is Act:
+        base = base.outerjoin(ActTag, ActTag.act_id == Act.id).outerjoin(Tag, Tag.id == ActTag.tag_id)
+    n = func.count(model.id.distinct())
+    counts = {}
+    if IS_POSTGRES:
+        exprs = list(cols.values())
+        flags = [func.grouping(e) for e in exprs]
+        rows = base.with_entities(*exprs, *flags, n).group_by(func.grouping_sets(*exprs)).all()
+        names = list(cols)
+        for row in rows:
+            values, grouped, count = row[:len(exprs)], row[len(exprs):-1], row[-1]
+            i = list(grouped).index(0)  # the one expression this row is grouped by
+            if values[i] is not None:
+                counts.setdefault(names[i], {})[values[i]] = count
+    else:
+        parts = [base.with_entities(literal(name).label("facet"), expr.label("value"), n.label("n")).group_by(expr)
+                 for name, expr in cols.items()]
+        for facet, value, count in parts[0].union_all(*parts[1:]).all():
+            if value is not None:
+                counts.setdefault(facet, {})[value] = count
+    return _format(counts, spec)
+
+def snapshot_facets(rows, model):
+    """Same counts computed over snapshot dict rows."""
+    spec = ACT_FACETS if model is Act else VENUE_FACETS
+    counts = {name: Counter() for name in spec}
+    for r in rows:
+        for name, (field, bands) in spec.items():
+            if field == "genres":
+                for tag in split_genres(r.get("genres")):
+                    counts[name][tag] += 1
+                continue
+            value = _band_of(r.get(field), bands) if bands else r.get(field)
+            if value is not None:
+                counts[name][value] += 1
+    return _format(counts, spec)
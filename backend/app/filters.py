@@ -0,0 +1,38 @@
+from sqlalchemy import func, text
+from .fulltext import IS_POSTGRES
+
+# Substring filters (location / genre / style) backed by pg_trgm.
+# Each filtered column gets a GIN trigram index on lower(col), so the
+# lower(col) LIKE '%x%' predicate built by contains() is answered from the
+# index instead of a sequential scan. Off Postgres the same predicate still
+# works, just unindexed.
+
+TRGM_COLUMNS = {
+    "acts": ["location", "genres"],
+    "venues": ["location", "style"],
+}
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def contains(column, value: str):
+    """Case-insensitive substring match written in the shape the trigram indexes cover."""
+    return func.lower(column).like(f"%{_escape_like(value.lower())}%", escape="\\")
+
+def ensure_trigram_indexes(db):
+    """Enable pg_trgm and create the lower(col) trigram indexes (Postgres only)."""
+    if not IS_POSTGRES:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        # Managed databases may refuse CREATE EXTENSION; filters still work unindexed.
+        print(f"⚠️  pg_trgm unavailable, substring filters will not be indexed: {e}")
+        return
+    for table, cols in TRGM_COLUMNS.items():
+        for col in cols:
+            db.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{col}_trgm "
+                f"ON {table} USING GIN (lower({col}) gin_trgm_ops)"
+            ))
@@ -0,0 +1,62 @@
+from sqlalchemy import Float, func, literal_column, or_, text
+from .db import engine
+from .models import Act, Venue
+
+# Full-text search behind the `q` parameter.
+# On Postgres each of acts/venues carries a generated, weighted `search_tsv`
+# column with a GIN index, and matches are ranked with ts_rank. Other databases
+# (local sqlite etc.) fall back to the old lower(col) LIKE '%q%' scan.
+# `search_tsv` is deliberately not mapped on the models so ORM queries keep
+# working on databases that don't have it.
+
+IS_POSTGRES = engine.dialect.name == "postgresql"
+TS_CONFIG = "english"
+
+# table -> [(column, weight)]; name > genres/style > description/amenities > location
+WEIGHTS = {
+    "acts": [("name", "A"), ("genres", "B"), ("description", "C"), ("location", "D")],
+    "venues": [("name", "A"), ("style", "B"), ("amenities", "C"), ("location", "D")],
+}
+LIKE_COLUMNS = {
+    "acts": [Act.name, Act.genres, Act.description, Act.location],
+    "venues": [Venue.name, Venue.style, Venue.amenities, Venue.location],
+}
+
+def _tsv_expression(table):
+    parts = [
+        f"setweight(to_tsvector('{TS_CONFIG}', coalesce({col}, '')), '{w}')"
+        for col, w in WEIGHTS[table]
+    ]
+    return " || ".join(parts)
+
+def ensure_search_columns(db):
+    """Create the generated tsvector columns and GIN indexes (Postgres only)."""
+    if not IS_POSTGRES:
+        return
+    for table in WEIGHTS:
+        db.execute(text(f"""
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_tsv tsvector
+            GENERATED ALWAYS AS ({_tsv_expression(table)}) STORED
+        """))
+        db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_tsv ON {table} USING GIN (search_tsv)"))
+
+def search_filter(model, q: str):
+    """
+    Returns (where_clause, rank) for a free-text query against `model`.
+    `rank` is None on the LIKE fallback, where there is nothing to rank by.
+    """
+    table = model.__tablename__
+    if IS_POSTGRES:
+        tsv = literal_column(f"{table}.search_tsv")
+        tsq = func.websearch_to_tsquery(literal_column(f"'{TS_CONFIG}'::regconfig"), q)
+        return tsv.op("@@")(tsq), func.ts_rank(tsv, tsq, type_=Float)
+    pattern = f"%{q.lower()}%"
+    return or_(*[func.lower(c).like(pattern) for c in LIKE_COLUMNS[table]]), None
+
+def apply_search(query, model, q: str, sort):
+    """Filter `query` by `q` and return it with the sort keys to use (rank first)."""
+    where, rank = search_filter(model, q)
+    query = query.filter(where)
+    if rank is not None:
+        sort = [(rank, True)] + list(sort)
+    return query, sort
@@ -0,0 +1,140 @@
+from fastapi import HTTPException
+from sqlalchemy import and_, select, text
+from .fulltext import IS_POSTGRES
+from .models import Booking, Lead, LeadUnlock
+from .pagination import DEFAULT_LIMIT, MAX_LIMIT, after, decode_cursor, encode_cursor, order_by
+
+# Business leads.
+# Listing: one joined leads -> bookings query per page, newest lead first,
+# keyset paginated on leads.id so a dashboard load costs the same however
+# many leads exist. Customer e-mails are redacted unless the requesting
+# business has unlocked the lead.
+# Unlocks are recorded in the lead_unlocks ledger (one row per business and
+# lead), so any number of businesses can unlock the same lead. The ledger
+# insert and the credit debit happen in a single statement; see unlock_leads.
+
+LEAD_SORT = [(Lead.id, True)]
+NO_CREDITS = "No credits. Upgrade to Pro to unlock more."
+
+def ensure_lead_tables(db):
+    # models.Lead / LeadUnlock live on a Base that init_db doesn't create
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS leads (
+            id SERIAL PRIMARY KEY,
+            booking_id INTEGER REFERENCES bookings(id),
+            unlocked_by_business_id INTEGER
+        )
+    """))
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS lead_unlocks (
+            business_id INTEGER NOT NULL,
+            lead_id INTEGER NOT NULL REFERENCES leads(id) ON DELETE CASCADE,
+            unlocked_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (business_id, lead_id)
+        )
+    """))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_leads_booking ON leads (booking_id)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_leads_unlocked ON leads (unlocked_by_business_id, id)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_act ON bookings (act_id)"))
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_venue ON bookings (venue_id)"))
+    # Carry over unlocks recorded in the old single-business column
+    db.execute(text("""
+        INSERT INTO lead_unlocks (business_id, lead_id)
+        SELECT unlocked_by_business_id, id FROM leads WHERE unlocked_by_business_id IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """))
+
+def lead_page(db, business_id, limit=None, cursor=None, date_from=None, date_to=None,
+              act_id=None, venue_id=None, unlocked_only=False):
+    """
+    One page of leads as dicts plus the next cursor.
+    date_from/date_to bound the booking date (ISO yyyy-mm-dd strings, inclusive).
+    """
+    limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    query = (
+        db.query(Lead.id, LeadUnlock.lead_id, Booking.id, Booking.date, Booking.act_id,
+                 Booking.venue_id, Booking.customer_name, Booking.customer_email, Booking.message)
+        .join(Booking, Booking.id == Lead.booking_id)
+    )
+    mine = and_(LeadUnlock.lead_id == Lead.id, LeadUnlock.business_id == business_id)
+    query = query.join(LeadUnlock, mine) if unlocked_only else query.outerjoin(LeadUnlock, mine)
+    if act_id is not None:
+        query = query.filter(Booking.act_id == act_id)
+    if venue_id is not None:
+        query = query.filter(Booking.venue_id == venue_id)
+    if date_from:
+        query = query.filter(Booking.date >= date_from)
+    if date_to:
+        query = query.filter(Booking.date <= date_to)
+    if cursor:
+        query = query.filter(after(LEAD_SORT, decode_cursor(cursor, len(LEAD_SORT))))
+    rows = query.order_by(*order_by(LEAD_SORT)).limit(limit + 1).all()
+    next_cursor = encode_cursor([rows[limit - 1][0]]) if len(rows) > limit else None
+    items = []
+    for lead_id, unlocked, booking_id, date, b_act, b_venue, name, email, message in rows[:limit]:
+        items.append({
+            "lead_id": lead_id, "booking_id": booking_id, "date": date, "act_id": b_act, "venue_id": b_venue,
+            "customer_name": name, "customer_email": email if unlocked else "unlock to view",
+            "message": message, "unlocked": unlocked is not None,
+        })
+    return items, next_cursor
+
+# Ledger insert + conditional debit in one round trip. The insert runs first
+# so concurrent unlocks of the same lead serialize on the ledger's primary
+# key and only the winner is charged; the debit is a single conditional
+# UPDATE, so credits can't go negative however many requests race.
+_UNLOCK_SQL = text("""
+    WITH found AS (
+        SELECT id FROM leads WHERE id = ANY(:ids)
+    ), ins AS (
+        INSERT INTO lead_unlocks (business_id, lead_id)
+        SELECT :biz, id FROM found
+        ON CONFLICT DO NOTHING
+        RETURNING lead_id
+    ), debit AS (
+        UPDATE businesses SET lead_credits = lead_credits - (SELECT count(*) FROM ins)
+        WHERE id = :biz AND (SELECT count(*) FROM ins) > 0
+          AND lead_credits >= (SELECT count(*) FROM ins)
+        RETURNING lead_credits
+    )
+    SELECT (SELECT lead_credits FROM debit),
+           (SELECT lead_credits FROM businesses WHERE id = :biz),
+           ARRAY(SELECT lead_id FROM ins),
+           ARRAY(SELECT id FROM found)
+""")
+
+def _unlock_portable(db, business_id, ids):
+    found = list(db.execute(select(Lead.id).where(Lead.id.in_(ids))).scalars())
+    unlocked = [lid for lid in found if db.execute(text(
+        "INSERT INTO lead_unlocks (business_id, lead_id) VALUES (:biz, :lid) ON CONFLICT DO NOTHING RETURNING lead_id"
+    ), {"biz": business_id, "lid": lid}).first()]
+    debited = None
+    if unlocked:
+        row = db.execute(text("""
+            UPDATE businesses SET lead_credits = lead_credits - :n
+            WHERE id = :biz AND lead_credits >= :n RETURNING lead_credits
+        """), {"n": len(unlocked), "biz": business_id}).first()
+        debited = row[0] if row else None
+    balance = db.execute(text("SELECT lead_credits FROM businesses WHERE id = :biz"), {"biz": business_id}).scalar()
+    return debited, balance, unlocked, found
+
+def unlock_leads(db, business_id, lead_ids):
+    """
+    Unlock `lead_ids` for a business, one credit per lead it hadn't unlocked yet.
+    All or nothing: without enough credits for every new unlock the
+    transaction is rolled back and 402 raised. The caller commits.
+    Returns {"credits", "unlocked": newly unlocked ids, "not_found": ids}.
+    """
+    ids = sorted({int(i) for i in lead_ids})
+    if IS_POSTGRES:
+        debited, balance, unlocked, found = db.execute(_UNLOCK_SQL, {"ids": ids, "biz": business_id}).one()
+    else:
+        debited, balance, unlocked, found = _unlock_portable(db, business_id, ids)
+    if unlocked and debited is None:
+        db.rollback()
+        raise HTTPException(402, NO_CREDITS)
+    return {
+        "credits": debited if debited is not None else balance,
+        "unlocked": sorted(unlocked),
+        "not_found": sorted(set(ids) - set(found)),
+    }
@@ -1,21 +1,44 @@
-﻿import os, json
-from datetime import datetime, timedelta
+﻿import os, json, base64
+from datetime import date, datetime, timedelta
 from fastapi import FastAPI, Depends, HTTPException, Response, Query, Request, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy import text
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Literal
 
-from .db import SessionLocal, init_db
+from .db import SessionLocal, check_async_engines, init_db, run_db, run_read, read_session, pool_stats
+from .read_routing import sticky_reads
 from .models import Act, Venue, User, Booking
+from .pagination import ACT_SORT, VENUE_SORT, ACT_RATING_SORT, VENUE_RATING_SORT, paginate, order_by, MAX_LIMIT
+from .pagination import DEFAULT_LIMIT, decode_cursor, encode_cursor
+from .fulltext import apply_search, ensure_search_columns
+from .filters import contains, ensure_trigram_indexes
+from .serializers import act_to_dict, venue_to_dict, act_card, venue_card, card_options
+from .serializers import JSONBytes, envelope, booking_to_dict, mapping_rows, submission_to_dict
+from . import approvals, catalog_cache
+from .tags import ensure_tag_tables, backfill_tags, genre_filter, write_tags
+from .facets import sql_facets, snapshot_facets
+from .media_store import ensure_media_table, media_response, migrate_data_urls, store_upload
+from . import thumbnails
+from .uploads import read_submission, spool_body
+from .leads import ensure_lead_tables
+from . import availability, catalog_import, counters, exports, ratings
 
 # Security helpers with fallbacks
+# Request paths hash/verify through password_pool (async, bounded, 503 when full)
 try:
-    from .security import verify_password, create_access_token, get_password_hash
+    from .security import create_access_token, get_password_hash
+    from .password_pool import hash_password, verify_password
+    from . import password_pool
 except Exception:
-    def verify_password(plain: str, hashed: str) -> bool:
-        return plain == hashed
+    password_pool = None
+    async def verify_password(plain: str, hashed: str):
+        return plain == hashed, None
+    async def hash_password(plain: str) -> str:
+        return plain
     def create_access_token(sub: str) -> str:
         return f"token-{sub}"
     def get_password_hash(plain: str) -> str:
@@ -53,6 +76,9 @@ async def force_cors(request, call_next):
     resp.headers["Access-Control-Allow-Origin"] = "*"
     return resp
 
+# Pin clients that just wrote to the primary (read-your-writes)
+app.middleware("http")(sticky_reads)
+
 # Database helper
 def get_db():
     db = SessionLocal()
@@ -61,43 +87,27 @@ def get_db():
     finally:
         db.close()
 
-# Serializers
-def act_to_dict(a: Act):
-    if not a:
-        return None
-    return {
-        "id": a.id,
-        "slug": getattr(a, "slug", f"act-{a.id}"),
-        "name": getattr(a, "name", "Untitled Act"),
-        "act_type": getattr(a, "act_type", "Entertainment"),
-        "location": getattr(a, "location", ""),
-        "price_from": getattr(a, "price_from", None),
-        "rating": getattr(a, "rating", 5.0),
-        "genres": getattr(a, "genres", ""),
-        "image_url": getattr(a, "image_url", ""),
-        "video_url": getattr(a, "video_url", ""),
-        "description": getattr(a, "description", ""),
-        "featured": getattr(a, "featured", False),
-        "premium": getattr(a, "premium", False),
-    }
+def get_read_db():
+    """Like get_db, but on the read replica when one is configured."""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
 
-def venue_to_dict(v: Venue):
-    if not v:
-        return None
-    return {
-        "id": v.id,
-        "slug": getattr(v, "slug", f"venue-{v.id}"),
-        "name": getattr(v, "name", "Untitled Venue"),
-        "location": getattr(v, "location", ""),
-        "capacity": getattr(v, "capacity", None),
-        "price_from": getattr(v, "price_from", None),
-        "style": getattr(v, "style", ""),
-        "image_url": getattr(v, "image_url", ""),
-        "amenities": getattr(v, "amenities", ""),
-        "description": getattr(v, "description", ""),
-        "featured": getattr(v, "featured", False),
-        "premium": getattr(v, "premium", False),
-    }
+def image_response(image_url: Optional[str]):
+    """Serve a stored image_url: decode inline data: URLs, redirect to external ones."""
+    if not image_url:
+        raise HTTPException(404, "No image")
+    if not image_url.startswith("data:"):
+        return RedirectResponse(image_url)
+    try:
+        header, encoded = image_url[5:].split(",", 1)
+        media_type = header.split(";")[0] or "image/jpeg"
+        body = base64.b64decode(encoded)
+    except Exception:
+        raise HTTPException(404, "No image")
+    return Response(body, media_type=media_type, headers={"Cache-Control": "public, max-age=86400"})
 
 # Health Check
 @app.get("/health")
@@ -105,33 +115,82 @@ def venue_to_dict(v: Venue):
 def health():
     return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/admin/pool")
+@app.get("/api/admin/pool")
+def admin_pool():
+    """Connection pool telemetry: checked-out connections, wait histogram, overflow and timeouts."""
+    return pool_stats()
+
 # Public Endpoints - Acts
+# Hot read paths are async: the handler bodies below are plain sync code run
+# by db.run_read on the asyncpg (replica) engine, so they don't hold a threadpool slot.
 @app.get("/acts")
 @app.get("/api/acts")
-def list_acts(
+async def list_acts(
     q: Optional[str] = None,
     location: Optional[str] = None,
     genre: Optional[str] = None,
+    genres: Optional[str] = None,
+    genre_match: Literal["any", "all"] = "any",
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     featured: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    min_rating: Optional[float] = None,
+    available_on: Optional[date] = None,
+    available_between: Optional[str] = None,
+    sort: Literal["default", "rating"] = "default",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    facets: bool = False,
 ):
+    free = availability.date_range(available_on, available_between)
+    return await run_read(
+        _list_acts, q=q, location=location, genre=genre, genres=genres, genre_match=genre_match,
+        min_price=min_price, max_price=max_price, featured=featured, min_rating=min_rating, free=free, sort=sort,
+        limit=limit, cursor=cursor, facets=facets,
+    )
+
+def _list_acts(db, q, location, genre, genres, genre_match, min_price, max_price, featured, min_rating, free, sort,
+               limit, cursor, facets):
+    # genre: substring match on the genres string; genres: exact tags, comma separated,
+    # matching any (default) or all of them
+    # min_rating / sort=rating use the review aggregates maintained by ratings.py
+    # free: (start, end) from available_on / available_between, acts with no blocked day in it
+    # Unranked listings in default order are answered from the in-process snapshot when possible
+    by_rating = sort == "rating"
+    snap = None if q or by_rating or free else catalog_cache.acts.get(db)
+    if snap is not None:
+        rows = snap.filter(
+            contains={"location": location, "genres": genre},
+            ranges={"price_from": (min_price, max_price), "rating": (min_rating, None)},
+            equals={"featured": featured},
+            tags={"genres": (genres, genre_match)},
+        )
+        if facets:
+            items, next_cursor = snap.page(rows, limit, cursor)
+            return JSONBytes(envelope(items=snap.encode(items), next_cursor=next_cursor,
+                                      facets=snapshot_facets(rows, Act)))
+        if limit is not None or cursor:
+            items, next_cursor = snap.page(rows, limit, cursor)
+            return JSONBytes(envelope(items=snap.encode(items), next_cursor=next_cursor))
+        return JSONBytes(snap.encode(rows))
+    
     query = db.query(Act)
+    sort = ACT_RATING_SORT if by_rating else ACT_SORT
     
     if q:
-        search = f"%{q.lower()}%"
-        query = query.filter(
-            (func.lower(Act.name).like(search)) |
-            (func.lower(Act.description).like(search)) |
-            (func.lower(Act.genres).like(search))
-        )
+        query, sort = apply_search(query, Act, q, sort)
     
     if location:
-        query = query.filter(func.lower(Act.location).like(f"%{location.lower()}%"))
+        query = query.filter(contains(Act.location, location))
     
     if genre:
-        query = query.filter(func.lower(Act.genres).like(f"%{genre.lower()}%"))
+        query = query.filter(contains(Act.genres, genre))
+    
+    if genres:
+        tag_clause = genre_filter(genres, genre_match)
+        if tag_clause is not None:
+            query = query.filter(tag_clause)
     
     if min_price is not None:
         query = query.filter(Act.price_from >= min_price)
@@ -142,27 +201,56 @@ def list_acts(
     if featured is not None:
         query = query.filter(Act.featured == featured)
     
-    rows = query.order_by(
-        Act.premium.desc(),
-        Act.featured.desc(),
-        Act.rating.desc(),
-        Act.id.desc()
-    ).all()
+    if min_rating is not None:
+        query = query.filter(Act.rating >= min_rating)
+    
+    if free:
+        query = query.filter(availability.free_between(*free))
+    
+    # Facets mode: first page plus sidebar counts for the whole filtered set
+    if facets:
+        counts = sql_facets(query, Act)
     
-    return [act_to_dict(a) for a in rows]
+    # List rows are cards: no description or inline image blobs
+    query = query.options(*card_options(Act))
+    
+    if facets:
+        rows, next_cursor = paginate(query, sort, limit, cursor)
+        return JSONBytes({"items": [act_card(a) for a in rows], "next_cursor": next_cursor, "facets": counts})
+    
+    # Paginated mode: pass limit and/or cursor to get {"items", "next_cursor"}
+    if limit is not None or cursor:
+        rows, next_cursor = paginate(query, sort, limit, cursor)
+        return JSONBytes({"items": [act_card(a) for a in rows], "next_cursor": next_cursor})
+    
+    rows = query.order_by(*order_by(sort)).all()
+    
+    return JSONBytes([act_card(a) for a in rows])
 
 @app.get("/acts/{act_id}")
 @app.get("/api/acts/{act_id}")
-def get_act(act_id: int, db: Session = Depends(get_db)):
-    a = db.query(Act).filter(Act.id == act_id).first()
-    if not a:
+async def get_act(act_id: int):
+    return await run_read(_get_act, act_id)
+
+def _get_act(db, act_id):
+    body = catalog_cache.acts.detail(db, act_id, _load_act)
+    if body is None:
         raise HTTPException(404, "Act not found")
-    return act_to_dict(a)
+    return JSONBytes(body)
+
+def _load_act(db, act_id):
+    return act_to_dict(db.query(Act).filter(Act.id == act_id).first())
+
+@app.get("/acts/{act_id}/image")
+@app.get("/api/acts/{act_id}/image")
+def get_act_image(act_id: int, db: Session = Depends(get_read_db)):
+    image_url = db.query(Act.image_url).filter(Act.id == act_id).scalar()
+    return image_response(image_url)
 
 # Public Endpoints - Venues
 @app.get("/venues")
 @app.get("/api/venues")
-def list_venues(
+async def list_venues(
     q: Optional[str] = None,
     location: Optional[str] = None,
     style: Optional[str] = None,
@@ -171,23 +259,49 @@ def list_venues(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     featured: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    min_rating: Optional[float] = None,
+    sort: Literal["default", "rating"] = "default",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    facets: bool = False,
 ):
+    return await run_read(
+        _list_venues, q=q, location=location, style=style, min_capacity=min_capacity, max_capacity=max_capacity,
+        min_price=min_price, max_price=max_price, featured=featured, min_rating=min_rating, sort=sort,
+        limit=limit, cursor=cursor, facets=facets,
+    )
+
+def _list_venues(db, q, location, style, min_capacity, max_capacity, min_price, max_price, featured, min_rating, sort,
+                 limit, cursor, facets):
+    by_rating = sort == "rating"
+    snap = None if q or by_rating else catalog_cache.venues.get(db)
+    if snap is not None:
+        rows = snap.filter(
+            contains={"location": location, "style": style},
+            ranges={"capacity": (min_capacity, max_capacity), "price_from": (min_price, max_price),
+                    "rating": (min_rating, None)},
+            equals={"featured": featured},
+        )
+        if facets:
+            items, next_cursor = snap.page(rows, limit, cursor)
+            return JSONBytes(envelope(items=snap.encode(items), next_cursor=next_cursor,
+                                      facets=snapshot_facets(rows, Venue)))
+        if limit is not None or cursor:
+            items, next_cursor = snap.page(rows, limit, cursor)
+            return JSONBytes(envelope(items=snap.encode(items), next_cursor=next_cursor))
+        return JSONBytes(snap.encode(rows))
+    
     query = db.query(Venue)
+    sort = VENUE_RATING_SORT if by_rating else VENUE_SORT
     
     if q:
-        search = f"%{q.lower()}%"
-        query = query.filter(
-            (func.lower(Venue.name).like(search)) |
-            (func.lower(Venue.description).like(search)) |
-            (func.lower(Venue.amenities).like(search))
-        )
+        query, sort = apply_search(query, Venue, q, sort)
     
     if location:
-        query = query.filter(func.lower(Venue.location).like(f"%{location.lower()}%"))
+        query = query.filter(contains(Venue.location, location))
     
     if style:
-        query = query.filter(func.lower(Venue.style).like(f"%{style.lower()}%"))
+        query = query.filter(contains(Venue.style, style))
     
     if min_capacity is not None:
         query = query.filter(Venue.capacity >= min_capacity)
@@ -204,21 +318,52 @@ def list_venues(
     if featured is not None:
         query = query.filter(Venue.featured == featured)
     
-    rows = query.order_by(
-        Venue.premium.desc(),
-        Venue.featured.desc(),
-        Venue.id.desc()
-    ).all()
+    if min_rating is not None:
+        query = query.filter(Venue.rating >= min_rating)
+    
+    if facets:
+        counts = sql_facets(query, Venue)
     
-    return [venue_to_dict(v) for v in rows]
+    # List rows are cards: no description or inline image blobs
+    query = query.options(*card_options(Venue))
+    
+    if facets:
+        rows, next_cursor = paginate(query, sort, limit, cursor)
+        return JSONBytes({"items": [venue_card(v) for v in rows], "next_cursor": next_cursor, "facets": counts})
+    
+    if limit is not None or cursor:
+        rows, next_cursor = paginate(query, sort, limit, cursor)
+        return JSONBytes({"items": [venue_card(v) for v in rows], "next_cursor": next_cursor})
+    
+    rows = query.order_by(*order_by(sort)).all()
+    
+    return JSONBytes([venue_card(v) for v in rows])
 
 @app.get("/venues/{venue_id}")
 @app.get("/api/venues/{venue_id}")
-def get_venue(venue_id: int, db: Session = Depends(get_db)):
-    v = db.query(Venue).filter(Venue.id == venue_id).first()
-    if not v:
+async def get_venue(venue_id: int):
+    return await run_read(_get_venue, venue_id)
+
+def _get_venue(db, venue_id):
+    body = catalog_cache.venues.detail(db, venue_id, _load_venue)
+    if body is None:
         raise HTTPException(404, "Venue not found")
-    return venue_to_dict(v)
+    return JSONBytes(body)
+
+def _load_venue(db, venue_id):
+    return venue_to_dict(db.query(Venue).filter(Venue.id == venue_id).first())
+
+@app.get("/venues/{venue_id}/image")
+@app.get("/api/venues/{venue_id}/image")
+def get_venue_image(venue_id: int, db: Session = Depends(get_read_db)):
+    image_url = db.query(Venue.image_url).filter(Venue.id == venue_id).scalar()
+    return image_response(image_url)
+
+# Media
+@app.get("/media/{media_hash}")
+@app.get("/api/media/{media_hash}")
+def get_media(media_hash: str, request: Request, db: Session = Depends(get_read_db)):
+    return media_response(db, media_hash, request)
 
 # Enquiries
 class EnquiryRequest(BaseModel):
@@ -234,6 +379,7 @@ class EnquiryRequest(BaseModel):
 def create_enquiry(data: EnquiryRequest, db: Session = Depends(get_db)):
     if not data.act_id and not data.venue_id:
         raise HTTPException(400, "Must specify act_id or venue_id")
+    availability.check_bookable(db, data.act_id, data.date)
     
     booking = Booking(
         customer_name=data.name,
@@ -259,32 +405,53 @@ class ReviewRequest(BaseModel):
 
 @app.get("/reviews")
 @app.get("/api/reviews")
-def list_reviews(
+async def list_reviews(
     act_id: Optional[int] = None,
     venue_id: Optional[int] = None,
     status: str = "approved",
-    db: Session = Depends(get_db)
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
 ):
-    sql = """
-        SELECT id, rating, comment, author_name, act_id, venue_id, 
-               status, created_at
-        FROM reviews
-        WHERE status = :status
+    return await run_read(_list_reviews, act_id, venue_id, status, limit, cursor)
+
+def review_feed(db, columns, where, params, limit=None, cursor=None, cap=100):
     """
-    params = {"status": status}
+    Newest-first reviews feed over ix_reviews_status_* (status, act_id|venue_id, id).
+    With limit and/or cursor: {"items", "next_cursor"}, keyset paginated on id;
+    otherwise the first `cap` rows as a plain list, as before.
+    """
+    paged = limit is not None or bool(cursor)
+    if cursor:
+        try:
+            params["before"] = int(decode_cursor(cursor, 1)[0])
+        except (TypeError, ValueError):
+            raise HTTPException(400, "Invalid cursor")
+        where = where + ["id < :before"]
+    limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT) if paged else cap
+    sql = f"SELECT {columns} FROM reviews"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT :n"
+    params["n"] = limit + 1 if paged else limit
+    rows = mapping_rows(db.execute(text(sql), params))
+    if not paged:
+        return JSONBytes(rows)
+    next_cursor = encode_cursor([rows[limit - 1]["id"]]) if len(rows) > limit else None
+    return JSONBytes({"items": rows[:limit], "next_cursor": next_cursor})
+
+def _list_reviews(db, act_id, venue_id, status, limit, cursor):
+    where, params = ["status = :status"], {"status": status}
     
     if act_id:
-        sql += " AND act_id = :act_id"
+        where.append("act_id = :act_id")
         params["act_id"] = act_id
     
     if venue_id:
-        sql += " AND venue_id = :venue_id"
+        where.append("venue_id = :venue_id")
         params["venue_id"] = venue_id
     
-    sql += " ORDER BY id DESC LIMIT 100"
-    
-    rows = db.execute(text(sql), params).mappings().all()
-    return [dict(r) for r in rows]
+    columns = "id, rating, comment, author_name, act_id, venue_id, status, created_at"
+    return review_feed(db, columns, where, params, limit, cursor)
 
 @app.post("/reviews")
 @app.post("/api/reviews")
@@ -339,12 +506,24 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
+def _find_user(db, email):
+    return db.query(User).filter(User.email == email).first()
+
+def _set_password_hash(db, user_id, password_hash):
+    db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+    db.commit()
+
 @app.post("/auth/login")
 @app.post("/api/auth/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not verify_password(data.password, getattr(user, "password_hash", "")):
+async def login(data: LoginRequest):
+    user = await run_db(_find_user, data.email)
+    if not user:
+        raise HTTPException(401, "Invalid credentials")
+    ok, new_hash = await verify_password(data.password, getattr(user, "password_hash", ""))
+    if not ok:
         raise HTTPException(401, "Invalid credentials")
+    if new_hash:  # hashing parameters changed since this password was stored
+        await run_db(_set_password_hash, user.id, new_hash)
     
     token = create_access_token(str(user.id))
     
@@ -363,42 +542,39 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
 @app.get("/admin/acts")
 @app.get("/api/admin/acts")
 def admin_acts(db: Session = Depends(get_db)):
-    rows = db.query(Act).order_by(Act.id.desc()).all()
-    return [act_to_dict(a) for a in rows]
+    rows = db.query(Act).options(*card_options(Act)).order_by(Act.id.desc()).all()
+    return JSONBytes([act_card(a) for a in rows])
 
 @app.get("/admin/venues")
 @app.get("/api/admin/venues")
 def admin_venues(db: Session = Depends(get_db)):
-    rows = db.query(Venue).order_by(Venue.id.desc()).all()
-    return [venue_to_dict(v) for v in rows]
+    rows = db.query(Venue).options(*card_options(Venue)).order_by(Venue.id.desc()).all()
+    return JSONBytes([venue_card(v) for v in rows])
 
 @app.get("/admin/bookings")
 @app.get("/api/admin/bookings")
 def admin_bookings(db: Session = Depends(get_db)):
     rows = db.query(Booking).order_by(Booking.id.desc()).all()
-    return [{
-        "id": b.id,
-        "customer_name": b.customer_name,
-        "customer_email": b.customer_email,
-        "date": b.date,
-        "message": b.message,
-        "act_id": b.act_id,
-        "venue_id": b.venue_id,
-        "created_at": b.created_at.isoformat() if b.created_at else None,
-    } for b in rows]
+    return JSONBytes([booking_to_dict(b) for b in rows])
 
 @app.get("/admin/reviews")
 @app.get("/api/admin/reviews")
-def admin_reviews(status: Optional[str] = None, db: Session = Depends(get_db)):
-    sql = "SELECT * FROM reviews"
-    params = {}
+def admin_reviews(status: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT),
+                  cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    where, params = [], {}
     if status:
-        sql += " WHERE status = :status"
+        where.append("status = :status")
         params["status"] = status
-    sql += " ORDER BY id DESC LIMIT 500"
-    
-    rows = db.execute(text(sql), params).mappings().all()
-    return [dict(r) for r in rows]
+    return review_feed(db, "*", where, params, limit, cursor, cap=500)
+
+@app.get("/admin/export/{kind}")
+@app.get("/api/admin/export/{kind}")
+def admin_export(kind: Literal["bookings", "reviews", "submissions"],
+                 format: Literal["ndjson", "csv"] = "ndjson",
+                 since: Optional[date] = None, until: Optional[date] = None,
+                 status: Optional[str] = None):
+    """Full-history export streamed as NDJSON or CSV; since/until bound created_at (inclusive)."""
+    return exports.export_response(SessionLocal(), kind, format, since, until, status)
 
 @app.patch("/admin/reviews/{review_id}")
 @app.patch("/api/admin/reviews/{review_id}")
@@ -406,17 +582,24 @@ def admin_update_review(review_id: int, status: str, db: Session = Depends(get_d
     if status not in ("approved", "rejected", "pending"):
         raise HTTPException(400, "Invalid status")
     
-    db.execute(text("UPDATE reviews SET status = :status WHERE id = :id"), {
-        "status": status,
-        "id": review_id,
-    })
+    # also moves the act/venue review aggregates when approval changes
+    if not ratings.set_review_status(db, review_id, status):
+        raise HTTPException(404, "Review not found")
     db.commit()
     
     return {"ok": True}
 
+@app.post("/admin/ratings/recompute")
+@app.post("/api/admin/ratings/recompute")
+def admin_recompute_ratings(db: Session = Depends(get_db)):
+    """Repair act/venue review aggregates that drifted from the approved reviews."""
+    fixed = ratings.recompute(db)
+    db.commit()
+    return {"ok": True, "fixed": fixed}
+
 @app.get("/admin/submissions")
 @app.get("/api/admin/submissions")
-def admin_submissions(status: Optional[str] = None, db: Session = Depends(get_db)):
+def admin_submissions(request: Request, status: Optional[str] = None, db: Session = Depends(get_db)):
     sql = "SELECT * FROM submissions"
     params = {}
     if status:
@@ -425,16 +608,8 @@ def admin_submissions(status: Optional[str] = None, db: Session = Depends(get_db
     sql += " ORDER BY id DESC LIMIT 500"
     
     rows = db.execute(text(sql), params).mappings().all()
-    result = []
-    for r in rows:
-        d = dict(r)
-        try:
-            d["payload"] = json.loads(d.get("payload_json") or "{}")
-        except:
-            d["payload"] = {}
-        result.append(d)
-    
-    return result
+    base = str(request.base_url)
+    return [submission_to_dict(r, base) for r in rows]
 
 @app.post("/admin/submissions/{submission_id}/approve")
 @app.post("/api/admin/submissions/{submission_id}/approve")
@@ -457,12 +632,13 @@ def admin_approve_submission(submission_id: int, db: Session = Depends(get_db)):
             genres=payload.get("genres") or payload.get("genre", ""),
             price_from=payload.get("price_from"),
             description=payload.get("description", ""),
-            rating=4.8,
+            rating=None,  # set from approved reviews, see ratings.py
             featured=False,
             premium=False,
         )
         db.add(act)
         db.flush()
+        write_tags(db, {act.id: act.genres})
         new_id = act.id
     else:
         venue = Venue(
@@ -483,6 +659,7 @@ def admin_approve_submission(submission_id: int, db: Session = Depends(get_db)):
     db.execute(text("UPDATE submissions SET status = 'approved' WHERE id = :id"), {
         "id": submission_id
     })
+    catalog_cache.bump(db)
     db.commit()
     
     return {"ok": True, "id": new_id}
@@ -504,6 +681,17 @@ def ensure_tables():
             )
         """))
         
+        # Review feeds: newest first per status, per act / venue (see review_feed)
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_reviews_status_act ON reviews (status, act_id, id DESC)"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_reviews_status_venue ON reviews (status, venue_id, id DESC)"))
+        db.execute(text("CREATE INDEX IF NOT EXISTS ix_reviews_status ON reviews (status, id DESC)"))
+        
+        # review_count / rating_sum / rating on acts and venues
+        ratings.ensure_rating_columns(db)
+        
+        # One typed row per act and day; blocked days indexed for available_on
+        availability.ensure_availability_table(db)
+        
         # Submissions table
         db.execute(text("""
             CREATE TABLE IF NOT EXISTS submissions (
@@ -515,6 +703,44 @@ def ensure_tables():
             )
         """))
         
+        # Listing indexes matching pagination.ACT_SORT / VENUE_SORT
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_acts_listing ON acts (
+                (COALESCE(premium, false)) DESC, (COALESCE(featured, false)) DESC,
+                (COALESCE(rating, 0)) DESC, id DESC
+            )
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_venues_listing ON venues (
+                (COALESCE(premium, false)) DESC, (COALESCE(featured, false)) DESC, id DESC
+            )
+        """))
+        
+        # Version row that catalog writes bump to invalidate snapshots
+        catalog_cache.ensure_version_table(db)
+        
+        # Content-addressed media store metadata
+        ensure_media_table(db)
+        thumbnails.ensure_variant_table(db)
+        
+        # Normalized genre tags, backfilled from acts.genres
+        ensure_tag_tables(db)
+        backfill_tags(db)
+        
+        # Weighted tsvector columns + GIN indexes for `q` (no-op off Postgres)
+        ensure_search_columns(db)
+        # Trigram indexes for location/genre/style substring filters
+        ensure_trigram_indexes(db)
+        
+        # Business leads: listing indexes and the per-business unlock ledger
+        ensure_lead_tables(db)
+        
+        # Unique slugs for catalog imports (upsert on slug)
+        catalog_import.ensure_import_indexes(db)
+        
+        # Trigger-maintained totals for /admin/summary (no-op off Postgres)
+        counters.ensure_counter_tables(db)
+        
         db.commit()
 
 def seed_data():
@@ -579,6 +805,9 @@ def seed_data():
                 ),
             ]
             db.add_all(acts)
+            db.flush()
+            # ensure_tables' backfill_tags ran before these existed
+            write_tags(db, {a.id: a.genres for a in acts})
         
         # Seed venues if empty
         if db.query(Venue).count() == 0:
@@ -633,14 +862,35 @@ def seed_data():
     finally:
         db.close()
 
+def migrate_media():
+    """Move inline base64 images into the media store if MEDIA_MIGRATE=1"""
+    if os.getenv("MEDIA_MIGRATE") != "1":
+        return
+    with SessionLocal() as db:
+        print(f"✅ Moved {migrate_data_urls(db)} inline images to the media store")
+
 @app.on_event("startup")
 def startup():
     print("🚀 Starting VenueHub API...")
     init_db()
     ensure_tables()
     seed_data()
+    migrate_media()
+    counters.start()
     print("✅ API ready!")
 
+@app.on_event("startup")
+async def check_async_db():
+    # async so the probe runs on the loop the asyncpg pool will serve
+    await check_async_engines()
+
+@app.on_event("shutdown")
+def shutdown():
+    thumbnails.shutdown()
+    counters.shutdown()
+    if password_pool is not None:
+        password_pool.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -657,12 +907,13 @@ class RegisterRequest(BaseModel):
 
 @app.post("/auth/register")
 @app.post("/api/auth/register")
-def register_user(data: RegisterRequest, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == data.email).first()
-    if existing:
+async def register_user(data: RegisterRequest):
+    if await run_db(_find_user, data.email):
         raise HTTPException(409, "Email already registered")
+    pwd_hash = await hash_password(data.password)
+    return await run_db(_create_user, data, pwd_hash)
 
-    pwd_hash = get_password_hash(data.password)
+def _create_user(db, data: RegisterRequest, pwd_hash: str):
     u = User(
         email=data.email,
         password_hash=pwd_hash,
@@ -705,19 +956,9 @@ def me(email: EmailStr = Query(None), db: Session = Depends(get_db)):
 
 @app.get("/admin/summary")
 @app.get("/api/admin/summary")
-def admin_summary(db: Session = Depends(get_db)):
-    acts = db.query(Act).count()
-    venues = db.query(Venue).count()
-    bookings = db.query(Booking).count()
-    pending_reviews = db.execute(text("SELECT COUNT(*) AS c FROM reviews WHERE status='pending'")).mappings().first()["c"]
-    pending_subs = db.execute(text("SELECT COUNT(*) AS c FROM submissions WHERE status='pending'")).mappings().first()["c"]
-    return {
-        "acts": acts,
-        "venues": venues,
-        "bookings": bookings,
-        "pending_reviews": pending_reviews,
-        "pending_submissions": pending_subs,
-    }
+def admin_summary(days: int = Query(0, ge=0, le=366), db: Session = Depends(get_db)):
+    """Dashboard totals (one counter row read); days > 0 adds per-day new-row counts."""
+    return counters.summary(db, days)
 
 @app.on_event("startup")
 def _vh_email_unique_index():
@@ -741,10 +982,13 @@ class RegisterRequest(BaseModel):
 
 @app.post("/auth/register")
 @app.post("/api/auth/register")
-def register_user(data: RegisterRequest, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == data.email).first():
+async def register_user(data: RegisterRequest):
+    if await run_db(_find_user, data.email):
         raise HTTPException(409, "Email already registered")
-    pwd_hash = get_password_hash(data.password)
+    pwd_hash = await hash_password(data.password)
+    return await run_db(_create_user_neon, data, pwd_hash)
+
+def _create_user_neon(db, data: RegisterRequest, pwd_hash: str):
     u = User(email=data.email, password_hash=pwd_hash,
              is_admin=False,
              is_provider=bool(data.is_provider),
@@ -763,14 +1007,8 @@ def register_user(data: RegisterRequest, db: Session = Depends(get_db)):
 
 @app.get("/admin/summary")
 @app.get("/api/admin/summary")
-def admin_summary(db: Session = Depends(get_db)):
-    acts = db.query(Act).count()
-    venues = db.query(Venue).count()
-    bookings = db.query(Booking).count()
-    pending_reviews = db.execute(text("SELECT COUNT(*) AS c FROM reviews WHERE status='pending'")).mappings().first()["c"]
-    pending_subs = db.execute(text("SELECT COUNT(*) AS c FROM submissions WHERE status='pending'")).mappings().first()["c"]
-    return {"acts":acts,"venues":venues,"bookings":bookings,
-            "pending_reviews":pending_reviews,"pending_submissions":pending_subs}
+def admin_summary(days: int = Query(0, ge=0, le=366), db: Session = Depends(get_db)):
+    return counters.summary(db, days)
 
 @app.on_event("startup")
 def _vh_email_unique_index():
@@ -792,15 +1030,12 @@ def debug_submissions_count(db: Session = Depends(get_db)):
 
 @app.get("/debug/submissions/last")
 @app.get("/api/debug/submissions/last")
-def debug_submissions_last(limit: int = 10, db: Session = Depends(get_db)):
+def debug_submissions_last(request: Request, limit: int = 10, db: Session = Depends(get_db)):
     rows = db.execute(text("SELECT id, role, status, created_at, payload_json FROM submissions ORDER BY id DESC LIMIT :n"), {"n": limit}).mappings().all()
     out: list[dict[str, Any]] = []
     for r in rows:
-        d = dict(r)
-        try:
-            d["payload"] = json.loads(d.pop("payload_json") or "{}")
-        except Exception:
-            d["payload"] = {}
+        d = submission_to_dict(r, str(request.base_url))
+        d.pop("payload_json", None)
         out.append(d)
     return out
 # === venuehub: submissions reject endpoint ===
@@ -816,43 +1051,12 @@ def admin_reject_submission(submission_id: int, db: Session = Depends(get_db)):
 @app.post("/api/providers/submit")
 async def provider_submit(request: Request, db: Session = Depends(get_db)):
     """Accept JSON or form-data (with optional 'image' file). Store as pending submission."""
-    payload = None
-    try:
-        ct = (request.headers.get("content-type") or "")
-        if "application/json" in ct:
-            payload = await request.json()
-    except Exception:
-        payload = None
-
-    # If not JSON, parse form (keeps fields as strings)
-    form = None
-    if payload is None:
-        try:
-            form = await request.form()
-            payload = {}
-            for k in form.keys():
-                # Skip the file object; we handle below
-                if k == "image":
-                    continue
-                payload[k] = form.get(k)
-        except Exception:
-            payload = {}
+    # Streamed and size-bounded; an uploaded image goes straight to the media store
+    data, files = await read_submission(request, db)
 
-    data = payload or {}
-
-    # Try to extract image (either form file or data URL already in payload)
-    image_url = data.get("image_url") or ""
-    try:
-        if form is None:
-            form = await request.form()
-        up = form.get("image")
-        if up is not None and hasattr(up, "read"):
-            import base64
-            b = await up.read()
-            ct = getattr(up, "content_type", None) or "image/jpeg"
-            image_url = f"data:{ct};base64,{base64.b64encode(b).decode()}"
-    except Exception:
-        pass
+    image_url = files.get("image") or data.get("image_url") or ""
+    if files.get("image"):
+        thumbnails.submit(image_url, db)
 
     def _to_int(x):
         try: return int(x) if x not in (None,"","null") else None
@@ -921,17 +1125,15 @@ async def admin_approve_submission_upload(
     except Exception:
         payload = {}
 
-    # Optional: convert uploaded file to data URL and prefer it
+    # Optional: store uploaded file in the media store and prefer it
     image_url = payload.get("image_url") or ""
     if image is not None:
         try:
-            import base64
-            b = await image.read()
-            ct = image.content_type or "image/jpeg"
-            image_url = f"data:{ct};base64,{base64.b64encode(b).decode()}"
+            image_url = await store_upload(db, image)
         except Exception:
             pass
 
+    thumbs = thumbnails.image_fields(db, image_url)
     role = (row["role"] or "").lower()
     if role == "act":
         act = Act(
@@ -941,12 +1143,15 @@ async def admin_approve_submission_upload(
             genres=payload.get("genres") or payload.get("genre",""),
             price_from=payload.get("price_from"),
             description=payload.get("description",""),
-            rating=4.8,
+            rating=None,  # set from approved reviews, see ratings.py
             featured=False,
             premium=False,
             image_url=image_url,
+            **thumbs,
         )
         db.add(act); db.flush()
+        write_tags(db, {act.id: act.genres})
+        target = ("acts", act.id)
     else:
         venue = Venue(
             name=payload.get("name",""),
@@ -959,10 +1164,15 @@ async def admin_approve_submission_upload(
             featured=False,
             premium=False,
             image_url=image_url,
+            **thumbs,
         )
         db.add(venue); db.flush()
+        target = ("venues", venue.id)
 
     db.execute(text("UPDATE submissions SET status = 'approved' WHERE id = :id"), {"id": submission_id})
+    catalog_cache.bump(db)
+    if not thumbs["thumb_url"]:
+        thumbnails.submit_after_commit(db, image_url, [target])
     db.commit()
     return {"ok": True}
 
@@ -975,50 +1185,31 @@ class BulkAction(BaseModel):
 @app.post("/api/admin/submissions/bulk")
 def admin_bulk_submissions(data: BulkAction, db: Session = Depends(get_db)):
     if not data.ids:
-        return {"ok": True, "processed": 0}
-
-    processed = 0
+        return {"ok": True, "processed": 0, "results": []}
     if data.action == "reject":
-        db.execute(text("UPDATE submissions SET status = 'rejected' WHERE id = ANY(:ids)"),
-                   {"ids": data.ids})
-        processed = len(data.ids)
+        processed, results = approvals.reject_submissions(db, data.ids)
     else:
-        # Approve without image (uses existing approve logic)
-        for sid in data.ids:
-            r = db.execute(text("SELECT role, payload_json FROM submissions WHERE id=:id"),
-                           {"id": sid}).mappings().first()
-            if not r: 
-                continue
-            payload = {}
-            try: payload = json.loads(r["payload_json"] or "{}")
-            except: payload = {}
-            role = (r["role"] or "").lower()
-            if role == "act":
-                obj = Act(
-                    name=payload.get("name",""),
-                    location=payload.get("location",""),
-                    act_type=payload.get("act_type","Entertainment"),
-                    genres=payload.get("genres") or payload.get("genre",""),
-                    price_from=payload.get("price_from"),
-                    description=payload.get("description",""),
-                    rating=4.8, featured=False, premium=False,
-                    image_url=payload.get("image_url") or ""
-                ); db.add(obj)
-            else:
-                obj = Venue(
-                    name=payload.get("name",""),
-                    location=payload.get("location",""),
-                    capacity=payload.get("capacity"),
-                    price_from=payload.get("price_from"),
-                    style=payload.get("style",""),
-                    amenities=payload.get("amenities",""),
-                    description=payload.get("description",""),
-                    featured=False, premium=False,
-                    image_url=payload.get("image_url") or ""
-                ); db.add(obj)
-            db.execute(text("UPDATE submissions SET status='approved' WHERE id=:id"), {"id": sid})
-            processed += 1
-        db.commit()
-    return {"ok": True, "processed": processed}
+        processed, results = approvals.approve_submissions(db, data.ids)
+    db.commit()
+    return {"ok": True, "processed": processed, "results": results}
+
+def _import_catalog(kind, body, fmt):
+    # COPY needs the psycopg connection, so this runs on a sync session in the threadpool
+    try:
+        with SessionLocal() as db:
+            return catalog_import.import_file(db, kind, body, fmt)
+    finally:
+        body.close()
+
+@app.post("/admin/import/{kind}")
+@app.post("/api/admin/import/{kind}")
+async def admin_import_catalog(kind: Literal["acts", "venues"], request: Request,
+                               format: Optional[Literal["csv", "jsonl"]] = None):
+    """Bulk import a CSV / JSON Lines request body; upserts on slug. Returns the import report."""
+    if format is None:
+        ctype = request.headers.get("content-type", "")
+        format = "jsonl" if ("ndjson" in ctype or "jsonl" in ctype) else "csv"
+    body = await spool_body(request, catalog_import.MAX_BYTES)
+    return await run_in_threadpool(_import_catalog, kind, body, format)
 
 
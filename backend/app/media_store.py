@@ -0,0 +1,207 @@
+import base64, hashlib, json, os, re, tempfile
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import text
+from . import catalog_cache
+
+# Content-addressed media store.
+# Uploaded images are written once to MEDIA_DIR/<h[:2]>/<h[2:4]>/<sha256> and
+# referenced from rows as /api/media/<sha256> instead of inline base64 data:
+# URLs. Identical uploads share one file. Metadata (content type, size) lives
+# in the media_blobs table; the bytes are served by GET /api/media/{hash} with
+# Range support and immutable cache headers.
+
+MEDIA_DIR = os.getenv("MEDIA_DIR", os.path.join(os.getcwd(), "media"))
+MEDIA_PREFIX = "/api/media/"
+CHUNK = 64 * 1024
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+def ensure_media_table(db):
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS media_blobs (
+            hash VARCHAR(64) PRIMARY KEY,
+            content_type VARCHAR(100) NOT NULL,
+            size_bytes BIGINT NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """))
+
+def blob_path(h: str) -> str:
+    return os.path.join(MEDIA_DIR, h[:2], h[2:4], h)
+
+def media_url(h: str) -> str:
+    return f"{MEDIA_PREFIX}{h}"
+
+def _record(db, h, content_type, size):
+    db.execute(text("""
+        INSERT INTO media_blobs (hash, content_type, size_bytes)
+        VALUES (:h, :ct, :n) ON CONFLICT (hash) DO NOTHING
+    """), {"h": h, "ct": content_type or "application/octet-stream", "n": size})
+
+def _commit_file(tmp_path, h):
+    """Move a finished temp file into place; if the blob already exists keep the old one."""
+    dest = blob_path(h)
+    if os.path.exists(dest):
+        os.remove(tmp_path)
+        return
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(tmp_path, dest)
+
+def _tmp_file():
+    os.makedirs(MEDIA_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=MEDIA_DIR, prefix=".upload-")
+    return os.fdopen(fd, "wb"), path
+
+def store_bytes(db, data: bytes, content_type: str) -> str:
+    """Store `data` (deduplicated) and return its /api/media URL."""
+    h = hashlib.sha256(data).hexdigest()
+    if not os.path.exists(blob_path(h)):
+        f, tmp = _tmp_file()
+        with f:
+            f.write(data)
+        _commit_file(tmp, h)
+    _record(db, h, content_type, len(data))
+    return media_url(h)
+
+class BlobWriter:
+    """Incremental writer: hashes and spools chunks to a temp file, then files it under its hash."""
+    def __init__(self):
+        self.digest, self.size = hashlib.sha256(), 0
+        self._file, self._tmp = _tmp_file()
+
+    def write(self, chunk: bytes):
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        self._file.write(chunk)
+
+    def finish(self, db, content_type) -> str:
+        self._file.close()
+        h = self.digest.hexdigest()
+        _commit_file(self._tmp, h)
+        _record(db, h, content_type, self.size)
+        return media_url(h)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+async def store_upload(db, upload) -> str:
+    """Stream an UploadFile into the store chunk by chunk, hashing as it goes."""
+    writer = BlobWriter()
+    try:
+        while True:
+            chunk = await upload.read(CHUNK)
+            if not chunk:
+                break
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.finish(db, getattr(upload, "content_type", None) or "image/jpeg")
+
+def store_data_url(db, value: str) -> str:
+    """data:<type>;base64,<payload> -> /api/media URL. Other values are returned unchanged."""
+    if not value or not value.startswith("data:"):
+        return value
+    header, encoded = value[5:].split(",", 1)
+    return store_bytes(db, base64.b64decode(encoded), header.split(";")[0] or "image/jpeg")
+
+def _parse_range(header, size):
+    m = re.match(r"bytes=(\d*)-(\d*)$", header or "")
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:  # suffix range: last N bytes
+        start, end = max(size - int(m.group(2)), 0), size - 1
+    if start > end or start >= size:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _iter_file(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def media_response(db, h: str, request: Request):
+    if not _HASH_RE.match(h):
+        raise HTTPException(404, "Media not found")
+    path = blob_path(h)
+    row = db.execute(text("SELECT content_type FROM media_blobs WHERE hash = :h"), {"h": h}).first()
+    if not row or not os.path.exists(path):
+        raise HTTPException(404, "Media not found")
+    size = os.path.getsize(path)
+    headers = {
+        "ETag": f'"{h}"',
+        "Accept-Ranges": "bytes",
+        # content-addressed: the bytes behind a URL never change
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    rng = _parse_range(request.headers.get("range"), size)
+    if rng:
+        start, end = rng
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(_iter_file(path, start, end - start + 1), status_code=206,
+                                 media_type=row[0], headers=headers)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file(path, 0, size), media_type=row[0], headers=headers)
+
+def migrate_data_urls(db, batch=50):
+    """
+    Move inline data: URLs out of acts/venues.image_url and submissions.payload_json
+    into the store. Commits per batch so it can be interrupted and re-run;
+    malformed values are left in place. Each moved image is queued for
+    thumbnails once its batch commits. Returns the number of rows rewritten.
+    """
+    from . import thumbnails  # imports this module
+    moved = 0
+    for table, column in (("acts", "image_url"), ("venues", "image_url"), ("submissions", "payload_json")):
+        pattern = "data:%" if column == "image_url" else '%"image_url": "data:%'
+        after = 0
+        while True:
+            rows = db.execute(text(
+                f"SELECT id, {column} FROM {table} WHERE id > :after AND {column} LIKE :pattern ORDER BY id LIMIT :n"
+            ), {"after": after, "pattern": pattern, "n": batch}).all()
+            if not rows:
+                break
+            for rid, value in rows:
+                try:
+                    if column == "image_url":
+                        value = url = store_data_url(db, value)
+                        targets = [(table, rid)]
+                    else:
+                        payload = json.loads(value or "{}")
+                        payload["image_url"] = url = store_data_url(db, payload.get("image_url") or "")
+                        value = json.dumps(payload)
+                        targets = []  # variants are ready for when the submission is approved
+                except Exception as e:
+                    print(f"⚠️  {table} {rid}: could not extract image: {e}")
+                    continue
+                db.execute(text(f"UPDATE {table} SET {column} = :v WHERE id = :id"), {"v": value, "id": rid})
+                thumbnails.submit_after_commit(db, url, targets)
+                moved += 1
+            if table != "submissions":
+                catalog_cache.bump(db)
+            db.commit()
+            after = rows[-1][0]
+    return moved
+
+if __name__ == "__main__":
+    # python -m app.media_store  -> one-off migration of existing data: URLs
+    from .db import SessionLocal
+    with SessionLocal() as db:
+        ensure_media_table(db)
+        db.commit()
+        print(f"✅ Moved {migrate_data_urls(db)} inline images into {MEDIA_DIR}")
+    from . import thumbnails
+    thumbnails.shutdown()  # wait for the queued thumbnails
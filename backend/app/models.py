@@ -1,7 +1,7 @@
 ﻿from sqlalchemy import ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, query_expression
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float  # etc
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Float  # etc
 from .db import Base
 from sqlalchemy.sql import func
 Base = declarative_base()
@@ -25,7 +25,15 @@ class Act(Base):
     id=Column(Integer, primary_key=True); slug=Column(String(255), unique=True, index=True)
     name=Column(String(255), nullable=False); act_type=Column(String(100), nullable=False); location=Column(String(120), nullable=False)
     price_from=Column(Float); rating=Column(Float); genres=Column(String(255)); image_url=Column(Text); video_url=Column(Text); description=Column(Text)
-    featured=Column(Boolean, default=False); premium=Column(Boolean, default=False)
+    featured=Column(Boolean, default=False); premium=Column(Boolean, default=False); thumb_url=Column(Text); thumb_srcset=Column(Text)
+    review_count=Column(Integer, nullable=False, default=0); rating_sum=Column(Integer, nullable=False, default=0)  # see ratings.py
+    image_ref=query_expression()  # card image reference, see serializers.card_options
+class Tag(Base):
+    __tablename__="tags"
+    id=Column(Integer, primary_key=True); name=Column(String(80), nullable=False); slug=Column(String(80), unique=True, nullable=False)
+class ActTag(Base):
+    __tablename__="act_tags"
+    act_id=Column(Integer, ForeignKey("acts.id"), primary_key=True); tag_id=Column(Integer, ForeignKey("tags.id"), primary_key=True)
 class Package(Base):
     __tablename__="packages"
     id=Column(Integer, primary_key=True); act_id=Column(Integer, ForeignKey("acts.id"))
@@ -33,15 +41,18 @@ class Package(Base):
 class Media(Base):
     __tablename__="media"
     id=Column(Integer, primary_key=True); act_id=Column(Integer, ForeignKey("acts.id"))
-    url=Column(Text, nullable=False); media_type=Column(String(20), default="image"); sort=Column(Integer, default=0)
+    url=Column(Text, nullable=False); media_type=Column(String(20), default="image"); sort=Column(Integer, default=0); thumb_url=Column(Text); thumb_srcset=Column(Text)
 class Availability(Base):
     __tablename__="availability"
     id=Column(Integer, primary_key=True); act_id=Column(Integer, ForeignKey("acts.id")); date=Column(String(20), nullable=False); is_available=Column(Boolean, default=True)
+    day=Column(Date, index=True)  # typed copy of date, unique per act; see availability.py
 class Venue(Base):
     __tablename__="venues"
     id=Column(Integer, primary_key=True); slug=Column(String(255), unique=True, index=True); name=Column(String(255), nullable=False)
     location=Column(String(120), nullable=False); capacity=Column(Integer); price_from=Column(Float); style=Column(String(120))
-    image_url=Column(Text); amenities=Column(Text); featured=Column(Boolean, default=False); premium=Column(Boolean, default=False)
+    image_url=Column(Text); amenities=Column(Text); featured=Column(Boolean, default=False); premium=Column(Boolean, default=False); thumb_url=Column(Text); thumb_srcset=Column(Text)
+    rating=Column(Float); review_count=Column(Integer, nullable=False, default=0); rating_sum=Column(Integer, nullable=False, default=0)
+    image_ref=query_expression()
 class Booking(Base):
     __tablename__="bookings"
     id=Column(Integer, primary_key=True); customer_name=Column(String(255), nullable=False); customer_email=Column(String(255), nullable=False)
@@ -56,6 +67,10 @@ class Lead(Base):
     __tablename__="leads"
     id=Column(Integer, primary_key=True); booking_id=Column(Integer, ForeignKey("bookings.id"))
     unlocked_by_business_id=Column(Integer, ForeignKey("businesses.id"), nullable=True)
+class LeadUnlock(Base):
+    __tablename__="lead_unlocks"
+    business_id=Column(Integer, ForeignKey("businesses.id"), primary_key=True); lead_id=Column(Integer, ForeignKey("leads.id"), primary_key=True)
+    unlocked_at=Column(DateTime(timezone=True), server_default=func.now())
 from sqlalchemy import Column, Integer, Text, TIMESTAMP
 from .db import Base
 
@@ -0,0 +1,95 @@
+import base64, json
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_, func, false, literal, literal_column
+from .models import Act, Venue
+
+# Keyset (cursor) pagination helpers.
+# A cursor is the sort-key tuple of the last row on a page, JSON + urlsafe base64
+# encoded so clients treat it as opaque. The next page is "rows strictly after
+# that tuple in the listing order", which Postgres answers from the index
+# instead of walking OFFSET rows.
+
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+
+# Listing orders shared by main.py and the routers. COALESCE keeps NULLs out of
+# the cursor and matches the expression indexes created in ensure_tables.
+ACT_SORT = [
+    (func.coalesce(Act.premium, false()), True),
+    (func.coalesce(Act.featured, false()), True),
+    (func.coalesce(Act.rating, literal_column("0")), True),
+    (Act.id, True),
+]
+VENUE_SORT = [
+    (func.coalesce(Venue.premium, false()), True),
+    (func.coalesce(Venue.featured, false()), True),
+    (Venue.id, True),
+]
+# sort=rating: best rated first, more reviews breaking ties (ix_acts_rating / ix_venues_rating)
+ACT_RATING_SORT = [
+    (func.coalesce(Act.rating, literal_column("0")), True),
+    (Act.review_count, True),
+    (Act.id, True),
+]
+VENUE_RATING_SORT = [
+    (func.coalesce(Venue.rating, literal_column("0")), True),
+    (Venue.review_count, True),
+    (Venue.id, True),
+]
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(400, "Invalid cursor")
+    return values
+
+def after(keys, values):
+    """
+    WHERE clause selecting rows that sort after `values`.
+    `keys` is a list of (expression, descending) pairs matching the ORDER BY.
+    When every key runs the same direction a single row comparison is used
+    (index-friendly); otherwise it expands to the usual OR-chain.
+    """
+    exprs = [e for e, _ in keys]
+    values = [literal(v, e.type) for e, v in zip(exprs, values)]
+    if all(d for _, d in keys):
+        return tuple_(*exprs) < tuple_(*values)
+    if not any(d for _, d in keys):
+        return tuple_(*exprs) > tuple_(*values)
+    clauses = []
+    for i, (expr, desc) in enumerate(keys):
+        prefix = [exprs[j] == values[j] for j in range(i)]
+        step = expr < values[i] if desc else expr > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+def order_by(keys):
+    return [e.desc() if d else e.asc() for e, d in keys]
+
+def paginate(query, keys, limit=None, cursor=None):
+    """
+    Apply keyset ordering/filtering to `query` and fetch one page.
+    Each key expression must be labelled so its value can be read back off the
+    row for the next cursor. Returns (rows, next_cursor); rows are the first
+    entity of each result row.
+    """
+    limit = min(max(int(limit or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    labelled = [e.label(f"_k{i}") for i, (e, _) in enumerate(keys)]
+    query = query.add_columns(*labelled)
+    if cursor:
+        query = query.filter(after(keys, decode_cursor(cursor, len(keys))))
+    rows = query.order_by(*order_by(keys)).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last[1 + i] for i in range(len(keys)))
+    return [r[0] for r in rows], next_cursor
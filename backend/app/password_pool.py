@@ -0,0 +1,66 @@
+import asyncio, multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+
+# Password hashing off the request path.
+# bcrypt runs in a small dedicated process pool so a sign-in burst uses at
+# most PASSWORD_WORKERS cores and never holds request threads or the event
+# loop. At most PASSWORD_QUEUE_MAX jobs may wait behind the running ones;
+# past that callers get an immediate 503 with Retry-After instead of
+# queueing. verify_password also rehashes when the stored hash uses outdated
+# parameters (passlib's verify_and_update), in the same worker call. Workers
+# come from a forkserver, never a fork of this threaded process (a child forked
+# while another thread holds a lock can deadlock).
+
+WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "16"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(WORKERS + QUEUE_MAX)
+
+# Worker-process side
+def _hash(plain):
+    from .security import pwd_context
+    return pwd_context.hash(plain)
+
+def _verify(plain, hashed):
+    from .security import pwd_context
+    try:
+        return pwd_context.verify_and_update(plain, hashed)
+    except (ValueError, TypeError):  # empty or unrecognized stored hash
+        return False, None
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        return _pool
+
+async def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HTTPException(503, "Too many sign-ins in progress, please retry", headers={"Retry-After": "1"})
+    try:
+        future = _executor().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda f: _slots.release())
+    return await asyncio.wrap_future(future)
+
+async def hash_password(plain: str) -> str:
+    return await _submit(_hash, plain)
+
+async def verify_password(plain: str, hashed: str):
+    """(ok, new_hash): new_hash is set when the stored hash should be replaced."""
+    if not hashed:
+        return False, None
+    return await _submit(_verify, plain, hashed)
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
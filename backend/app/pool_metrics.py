@@ -0,0 +1,79 @@
+import threading, time
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+# Connection pool telemetry.
+# timed_pool(QueuePool) returns a pool class whose checkouts are timed: how
+# long each request waited for a connection (histogram), how many checkouts
+# went into overflow, and how many gave up with a pool timeout. Counters live
+# on the class so they survive engine.dispose() / pool.recreate().
+
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.buckets = [0] * (len(BUCKETS_MS) + 1)
+            self.checkouts = self.overflow_checkouts = self.timeouts = 0
+            self.wait_total = self.wait_max = 0.0
+            self.peak_checked_out = 0
+
+    def record(self, pool, seconds, timed_out=False):
+        ms = seconds * 1000
+        i = next((n for n, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))
+        checked_out = _call(pool, "checkedout")
+        with self._lock:
+            self.buckets[i] += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            if (_call(pool, "overflow") or 0) > 0:
+                self.overflow_checkouts += 1
+            if checked_out is not None:
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self, pool):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            labels = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+            return {
+                "pool": type(pool).__name__,
+                "size": _call(pool, "size"),
+                "checked_out": _call(pool, "checkedout"),
+                "checked_in": _call(pool, "checkedin"),
+                "overflow": _call(pool, "overflow"),
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_total * 1000 / waits, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_max * 1000, 3),
+                "wait_ms_histogram": dict(zip(labels, self.buckets)),
+            }
+
+def _call(pool, name):
+    # NullPool has none of the sizing methods
+    fn = getattr(pool, name, None)
+    return fn() if fn else None
+
+def timed_pool(base):
+    """Subclass of pool class `base` that records checkout waits in `.metrics`."""
+    metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = base._do_get(self)
+        except PoolTimeout:
+            metrics.record(self, time.perf_counter() - start, timed_out=True)
+            raise
+        metrics.record(self, time.perf_counter() - start)
+        return conn
+
+    return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get, "metrics": metrics})
@@ -0,0 +1,130 @@
+import os, threading, time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from fastapi import Depends, HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from .db import get_db
+from .models import Business, Provider, User
+from .security import bearer, SECRET_KEY, jwt
+
+# Authenticated principal cache.
+# current_user resolves a bearer token to a Principal (user id, roles and
+# provider/business ids, from one joined query) and caches it per token for
+# PRINCIPAL_CACHE_TTL seconds, never past the token's own expiry, so
+# dashboard calls skip both the JWT decode and the users lookup. The cache is
+# an LRU bounded at PRINCIPAL_CACHE_SIZE entries. ORM inserts, updates and
+# deletes of User/Provider/Business drop that user's entries in this worker
+# (again after commit); other workers pick the change up within the TTL.
+# A cache miss is loaded on the request's own session (db.get_db), so it
+# doesn't hold a second pooled connection.
+
+TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+class Principal(NamedTuple):
+    id: int
+    email: str
+    is_admin: bool
+    is_provider: bool
+    is_business: bool
+    provider_id: Optional[int]
+    business_id: Optional[int]
+
+_cache = OrderedDict()  # token -> (principal, expires_at)
+_by_user = {}           # user id -> tokens, for invalidation
+_lock = threading.Lock()
+
+def _get(token):
+    with _lock:
+        hit = _cache.get(token)
+        if hit is None:
+            return None
+        if hit[1] <= time.time():
+            _drop(token)
+            return None
+        _cache.move_to_end(token)
+        return hit[0]
+
+def _put(token, principal, expires_at):
+    with _lock:
+        _cache[token] = (principal, expires_at)
+        _cache.move_to_end(token)
+        _by_user.setdefault(principal.id, set()).add(token)
+        while len(_cache) > MAX_ENTRIES:
+            _drop(next(iter(_cache)))
+
+def _drop(token):
+    entry = _cache.pop(token, None)
+    if entry is not None:
+        tokens = _by_user.get(entry[0].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del _by_user[entry[0].id]
+
+def invalidate_user(user_id):
+    with _lock:
+        for token in list(_by_user.get(user_id, ())):
+            _drop(token)
+
+def clear():
+    with _lock:
+        _cache.clear()
+        _by_user.clear()
+
+def load_principal(db, email):
+    row = (
+        db.query(User.id, User.email, User.is_admin, User.is_provider, User.is_business, Provider.id, Business.id)
+        .outerjoin(Provider, Provider.user_id == User.id)
+        .outerjoin(Business, Business.user_id == User.id)
+        .filter(User.email == email)
+        .first()
+    )
+    if row is None:
+        return None
+    uid, mail, admin, provider, business, provider_id, business_id = row
+    return Principal(uid, mail, bool(admin), bool(provider), bool(business), provider_id, business_id)
+
+def current_user(creds=Depends(bearer), db: Session = Depends(get_db)) -> Principal:
+    """Shared auth dependency: the Principal for the bearer token (401 if missing/invalid)."""
+    if not creds:
+        raise HTTPException(401, "Not authenticated")
+    token = creds.credentials
+    principal = _get(token)
+    if principal is not None:
+        return principal
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(401, "Token expired")
+    except Exception:
+        raise HTTPException(401, "Invalid token")
+    principal = load_principal(db, payload.get("sub"))
+    if principal is None:
+        raise HTTPException(401, "User not found")
+    if TTL > 0:
+        expires_at = time.time() + TTL
+        if payload.get("exp"):
+            expires_at = min(expires_at, float(payload["exp"]))
+        _put(token, principal, expires_at)
+    return principal
+
+def _changed(user_id, target):
+    if user_id is None:
+        return
+    invalidate_user(user_id)
+    # and again once committed, in case a concurrent request re-cached the old state
+    session = object_session(target)
+    if session is not None:
+        event.listen(session, "after_commit", lambda s: invalidate_user(user_id), once=True)
+
+def _user_changed(mapper, connection, target):
+    _changed(target.id, target)
+
+def _profile_changed(mapper, connection, target):
+    _changed(target.user_id, target)
+
+for _model, _listener in ((User, _user_changed), (Provider, _profile_changed), (Business, _profile_changed)):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _listener)
@@ -0,0 +1,96 @@
+from sqlalchemy import inspect, text
+from . import catalog_cache
+from .fulltext import IS_POSTGRES
+
+# Review aggregates on acts and venues.
+# Each row carries review_count and rating_sum over its approved reviews, and
+# rating = rating_sum / review_count (NULL once its last approved review goes;
+# rows never reviewed keep whatever rating they were seeded with, and rank
+# after reviewed rows of the same rating). rating isn't part of the write
+# schemas or catalog imports. set_review_status() applies the +/-1 delta
+# whenever a review moves into or out of "approved", in the same transaction
+# as the status change, so listings sort and filter on a plain indexed column.
+# recompute() backfills the columns when they are first added; afterwards it
+# is a maintenance job (POST /api/admin/ratings/recompute or
+# `python -m app.ratings`) that repairs rows that drifted, e.g. after reviews
+# were changed in raw SQL.
+
+TABLES = ("acts", "venues")
+
+def ensure_rating_columns(db):
+    """Aggregate columns + indexes; backfilled from reviews when first added."""
+    added = False
+    for table in TABLES:
+        existing = {c["name"] for c in inspect(db.connection()).get_columns(table)}
+        for column, ddl in (("rating", "DOUBLE PRECISION"), ("review_count", "INTEGER NOT NULL DEFAULT 0"),
+                            ("rating_sum", "INTEGER NOT NULL DEFAULT 0")):
+            if column not in existing:
+                db.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                added = True
+        db.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS ix_{table}_rating ON {table} ((COALESCE(rating, 0)) DESC, review_count DESC, id DESC)
+        """))
+    if added:
+        recompute(db)
+
+def recompute(db):
+    """
+    Rebuild the aggregates from the approved reviews (one statement per table),
+    writing only rows that differ. Rows that never had an approved review keep
+    their rating. Returns the number of rows fixed.
+    """
+    fixed = 0
+    for table, fk in (("acts", "act_id"), ("venues", "venue_id")):
+        fixed += db.execute(text(f"""
+            UPDATE {table} SET review_count = agg.n, rating_sum = agg.total,
+                rating = CASE WHEN agg.n > 0 THEN agg.total * 1.0 / agg.n
+                              WHEN {table}.review_count > 0 THEN NULL ELSE {table}.rating END
+            FROM (
+                SELECT t.id, COUNT(r.id) AS n, COALESCE(SUM(r.rating), 0) AS total
+                FROM {table} t LEFT JOIN reviews r ON r.{fk} = t.id AND r.status = 'approved'
+                GROUP BY t.id
+            ) agg
+            WHERE {table}.id = agg.id AND ({table}.review_count <> agg.n OR {table}.rating_sum <> agg.total
+                OR (agg.n > 0 AND ({table}.rating IS NULL OR {table}.rating <> agg.total * 1.0 / agg.n)))
+        """)).rowcount
+    if fixed:
+        catalog_cache.bump(db)
+    return fixed
+
+if __name__ == "__main__":
+    # python -m app.ratings  -> repair drifted review aggregates
+    from .db import SessionLocal
+    with SessionLocal() as db:
+        fixed = recompute(db)
+        db.commit()
+    print(f"✅ Recomputed review aggregates, {fixed} rows fixed")
+
+def _apply(db, table, row_id, delta, rating):
+    db.execute(text(f"""
+        UPDATE {table} SET review_count = review_count + :d, rating_sum = rating_sum + :d * :r,
+            rating = CASE WHEN review_count + :d > 0
+                          THEN (rating_sum + :d * :r) * 1.0 / (review_count + :d) END
+        WHERE id = :id
+    """), {"d": delta, "r": rating, "id": row_id})
+
+def set_review_status(db, review_id, status):
+    """
+    Change a review's status, keeping its act/venue aggregates in step.
+    Returns False if there is no such review. The caller commits.
+    """
+    lock = " FOR UPDATE" if IS_POSTGRES else ""
+    row = db.execute(text(f"SELECT status, rating, act_id, venue_id FROM reviews WHERE id = :id{lock}"),
+                     {"id": review_id}).first()
+    if row is None:
+        return False
+    old, rating, act_id, venue_id = row
+    db.execute(text("UPDATE reviews SET status = :status WHERE id = :id"), {"status": status, "id": review_id})
+    delta = (status == "approved") - (old == "approved")
+    if delta and rating is not None:
+        if act_id:
+            _apply(db, "acts", act_id, delta, rating)
+        if venue_id:
+            _apply(db, "venues", venue_id, delta, rating)
+        if act_id or venue_id:
+            catalog_cache.bump(db)
+    return True
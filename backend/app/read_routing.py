@@ -0,0 +1,51 @@
+import contextvars, os, time
+
+# Read-your-writes stickiness for replica routing.
+# After a successful write (POST/PUT/PATCH/DELETE) a client is pinned to the
+# primary for READ_STICKY_SECONDS, long enough for the replica to catch up:
+# the response sets a short-lived cookie, and the worker also remembers the
+# client (bearer token, else forwarded IP) for clients that don't send
+# cookies cross-origin. sticky_reads() is the HTTP middleware; it sets
+# use_primary for the request, which db.run_read / get_read_db consult.
+
+STICKY_SECONDS = float(os.getenv("READ_STICKY_SECONDS", "10"))
+COOKIE = "vh_rw"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+use_primary = contextvars.ContextVar("use_primary", default=False)
+_writers = {}  # client key -> monotonic expiry
+
+def _client_key(request):
+    auth = request.headers.get("authorization")
+    if auth:
+        return auth
+    fwd = request.headers.get("x-forwarded-for")
+    if fwd:
+        return fwd.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+def _prune(now):
+    for key in [k for k, exp in _writers.items() if exp <= now]:
+        _writers.pop(key, None)
+
+def is_sticky(request):
+    if request.cookies.get(COOKIE):
+        return True
+    exp = _writers.get(_client_key(request))
+    return exp is not None and exp > time.monotonic()
+
+async def sticky_reads(request, call_next):
+    token = use_primary.set(request.method in WRITE_METHODS or is_sticky(request))
+    try:
+        resp = await call_next(request)
+    finally:
+        use_primary.reset(token)
+    if request.method in WRITE_METHODS and resp.status_code < 400 and STICKY_SECONDS > 0:
+        now = time.monotonic()
+        if len(_writers) > 10000:
+            _prune(now)
+        key = _client_key(request)
+        if key:
+            _writers[key] = now + STICKY_SECONDS
+        resp.set_cookie(COOKIE, "1", max_age=int(STICKY_SECONDS) or 1, httponly=True, samesite="lax")
+    return resp
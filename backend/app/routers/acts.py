@@ -1,24 +1,35 @@
+from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
 from ..db import SessionLocal
 from ..models import Act
-from ..schemas import ActOut
+from ..schemas import ActOut, ActPage
+from ..fulltext import apply_search
+from ..filters import contains
+from ..availability import date_range, free_between
+from ..pagination import ACT_SORT, paginate, order_by, MAX_LIMIT
 router = APIRouter()
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
-@router.get("/acts", response_model=List[ActOut])
-def list_acts(q: Optional[str] = None, location: Optional[str] = None, act_type: Optional[str] = None, genre: Optional[str] = None, min_price: Optional[float] = Query(None, ge=0), max_price: Optional[float] = Query(None, ge=0), db: Session = Depends(get_db)):
+@router.get("/acts", response_model=Union[List[ActOut], ActPage])
+def list_acts(q: Optional[str] = None, location: Optional[str] = None, act_type: Optional[str] = None, genre: Optional[str] = None, min_price: Optional[float] = Query(None, ge=0), max_price: Optional[float] = Query(None, ge=0), available_on: Optional[date] = None, available_between: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db)):
     query = db.query(Act)
-    if q: query = query.filter(Act.name.ilike(f"%{q}%") | Act.description.ilike(f"%{q}%"))
-    if location: query = query.filter(Act.location.ilike(f"%{location}%"))
+    sort = ACT_SORT
+    if q: query, sort = apply_search(query, Act, q, sort)
+    if location: query = query.filter(contains(Act.location, location))
     if act_type: query = query.filter(Act.act_type == act_type)
-    if genre: query = query.filter(Act.genres.ilike(f"%{genre}%"))
+    if genre: query = query.filter(contains(Act.genres, genre))
     if min_price is not None: query = query.filter(Act.price_from >= min_price)
     if max_price is not None: query = query.filter(Act.price_from <= max_price)
-    return query.order_by(Act.premium.desc(), Act.featured.desc(), Act.rating.desc().nullslast()).all()
+    free = date_range(available_on, available_between)
+    if free: query = query.filter(free_between(*free))
+    if limit is not None or cursor:
+        items, next_cursor = paginate(query, sort, limit, cursor)
+        return {"items": items, "next_cursor": next_cursor}
+    return query.order_by(*order_by(sort)).all()
 @router.get("/acts/{slug}", response_model=ActOut)
 def get_act(slug: str, db: Session = Depends(get_db)):
     a = db.query(Act).filter(Act.slug == slug).first()
@@ -1,39 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from ..db import SessionLocal
+from fastapi import APIRouter, HTTPException
+from ..db import run_db
 from ..models import User, Provider, Business
 from ..schemas import LoginRequest, Token
-from ..security import verify_password, get_password_hash, create_access_token
+from ..security import create_access_token
+from ..password_pool import hash_password, verify_password
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+def _find_user(db, email): return db.query(User).filter(User.email == email).first()
+def _set_password_hash(db, user_id, password_hash):
+    db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash}); db.commit()
 @router.post("/login", response_model=Token)
-def login(body: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == body.email).first()
-    if not user or not verify_password(body.password, user.password_hash):
+async def login(body: LoginRequest):
+    user = await run_db(_find_user, body.email)
+    ok, new_hash = await verify_password(body.password, user.password_hash) if user else (False, None)
+    if not ok:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    if new_hash: await run_db(_set_password_hash, user.id, new_hash)
     roles = {"admin": user.is_admin, "provider": user.is_provider, "business": user.is_business}
     token = create_access_token(sub=user.email, roles=roles)
     return {"access_token": token, "token_type": "bearer"}
-@router.post("/register/provider", response_model=Token)
-def register_provider(email: str, password: str, display_name: str, db: Session = Depends(get_db)):
-    if db.query(User).filter_by(email=email).first():
-        raise HTTPException(400, "Email exists")
-    u = User(email=email, password_hash=get_password_hash(password), is_provider=True)
+def _create_provider(db, email, password_hash, display_name):
+    u = User(email=email, password_hash=password_hash, is_provider=True)
     db.add(u); db.flush()
     db.add(Provider(user_id=u.id, display_name=display_name, status="pending"))
     db.commit()
+@router.post("/register/provider", response_model=Token)
+async def register_provider(email: str, password: str, display_name: str):
+    if await run_db(_find_user, email):
+        raise HTTPException(400, "Email exists")
+    await run_db(_create_provider, email, await hash_password(password), display_name)
     token = create_access_token(sub=email, roles={"admin":False,"provider":True,"business":False})
     return {"access_token": token, "token_type": "bearer"}
-@router.post("/register/business", response_model=Token)
-def register_business(email: str, password: str, company: str, db: Session = Depends(get_db)):
-    if db.query(User).filter_by(email=email).first():
-        raise HTTPException(400, "Email exists")
-    u = User(email=email, password_hash=get_password_hash(password), is_business=True)
+def _create_business(db, email, password_hash, company):
+    u = User(email=email, password_hash=password_hash, is_business=True)
     db.add(u); db.flush()
     db.add(Business(user_id=u.id, company=company, plan="free", lead_credits=3))
     db.commit()
+@router.post("/register/business", response_model=Token)
+async def register_business(email: str, password: str, company: str):
+    if await run_db(_find_user, email):
+        raise HTTPException(400, "Email exists")
+    await run_db(_create_business, email, await hash_password(password), company)
     token = create_access_token(sub=email, roles={"admin":False,"provider":False,"business":True})
-    return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": token, "token_type": "bearer"}
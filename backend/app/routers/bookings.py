@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from ..db import SessionLocal
 from ..models import Booking, Lead
 from ..schemas import BookingBase, BookingOut
+from ..availability import check_bookable
 router = APIRouter()
 def get_db():
     db = SessionLocal()
@@ -10,4 +11,5 @@ def get_db():
     finally: db.close()
 @router.post("/bookings", response_model=BookingOut)
 def create_booking(payload: BookingBase, db: Session = Depends(get_db)):
+    check_bookable(db, payload.act_id, payload.date)
     b = Booking(**payload.dict()); db.add(b); db.flush(); db.add(Lead(booking_id=b.id)); db.commit(); db.refresh(b); return b
\ No newline at end of file
@@ -1,32 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from ..db import SessionLocal
-from ..models import User, Business, Booking, Lead
-from ..security import bearer, SECRET_KEY, jwt
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from ..db import get_db  # same dependency as current_user: one session per request
+from ..models import Business
+from ..principals import Principal, current_user
+from ..leads import lead_page, unlock_leads
+from ..pagination import MAX_LIMIT
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-def current_user(creds=Depends(bearer), db: Session = Depends(get_db)) -> User:
-    if not creds: raise HTTPException(401, "Not authenticated")
-    payload = jwt.decode(creds.credentials, SECRET_KEY, algorithms=["HS256"])
-    u = db.query(User).filter_by(email=payload["sub"]).first()
-    if not u: raise HTTPException(401, "User not found")
-    return u
 @router.get("/business/leads")
-def list_leads(user: User = Depends(current_user), db: Session = Depends(get_db)):
-    biz = db.query(Business).filter_by(user_id=user.id).first()
-    leads = db.query(Lead).all(); result=[]
-    for l in leads:
-        b = db.query(Booking).get(l.booking_id)
-        redacted_email = b.customer_email if l.unlocked_by_business_id == biz.id else "unlock to view"
-        result.append({"lead_id":l.id,"booking_id":b.id,"date":b.date,"act_id":b.act_id,"venue_id":b.venue_id,"customer_name":b.customer_name,"customer_email":redacted_email,"message":b.message,"unlocked":l.unlocked_by_business_id==biz.id})
-    return {"credits": biz.lead_credits, "items": result}
+def list_leads(limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               act_id: Optional[int] = None, venue_id: Optional[int] = None, unlocked_only: bool = False,
+               user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    if not user.business_id: raise HTTPException(403, "Business profile required")
+    biz = db.query(Business.id, Business.lead_credits).filter_by(id=user.business_id).first()
+    if not biz: raise HTTPException(403, "Business profile required")
+    items, next_cursor = lead_page(db, biz.id, limit, cursor, date_from, date_to, act_id, venue_id, unlocked_only)
+    return {"credits": biz.lead_credits, "items": items, "next_cursor": next_cursor}
 @router.post("/business/leads/{lead_id}/unlock")
-def unlock_lead(lead_id: int, user: User = Depends(current_user), db: Session = Depends(get_db)):
-    biz = db.query(Business).filter_by(user_id=user.id).first()
-    if biz.lead_credits <= 0: raise HTTPException(402, "No credits. Upgrade to Pro to unlock more.")
-    l = db.query(Lead).get(lead_id)
-    if not l: raise HTTPException(404, "Lead not found")
-    l.unlocked_by_business_id = biz.id; biz.lead_credits -= 1; db.commit(); return {"ok": True, "credits": biz.lead_credits}
\ No newline at end of file
+def unlock_lead(lead_id: int, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    if not user.business_id: raise HTTPException(403, "Business profile required")
+    res = unlock_leads(db, user.business_id, [lead_id])
+    if res["not_found"]: raise HTTPException(404, "Lead not found")
+    db.commit(); return {"ok": True, "credits": res["credits"]}
+class BulkUnlock(BaseModel):
+    lead_ids: List[int] = Field(..., min_length=1, max_length=MAX_LIMIT)
+@router.post("/business/leads/unlock")
+def unlock_leads_bulk(body: BulkUnlock, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    """Unlock several leads at once; all or nothing on credits."""
+    if not user.business_id: raise HTTPException(403, "Business profile required")
+    res = unlock_leads(db, user.business_id, body.lead_ids)
+    db.commit(); return {"ok": True, **res}
@@ -1,8 +1,10 @@
+import heapq
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ..db import SessionLocal
 from ..models import Act, Venue
 from ..schemas import ActOut, VenueOut
+from .. import catalog_cache
 router = APIRouter()
 def get_db():
     db = SessionLocal()
@@ -10,7 +12,12 @@ def get_db():
     finally: db.close()
 @router.get("/featured/acts", response_model=list[ActOut])
 def featured_acts(db: Session = Depends(get_db)):
+    snap = catalog_cache.acts.get(db)
+    if snap is not None: return snap.rows[:8]
     return db.query(Act).order_by(Act.premium.desc(), Act.featured.desc(), Act.rating.desc()).limit(8).all()
 @router.get("/featured/venues", response_model=list[VenueOut])
 def featured_venues(db: Session = Depends(get_db)):
+    snap = catalog_cache.venues.get(db)
+    if snap is not None:
+        return heapq.nsmallest(8, snap.rows, key=lambda v: (not v.get("premium"), not v.get("featured"), v.get("price_from") is None, v.get("price_from") or 0))
     return db.query(Venue).order_by(Venue.premium.desc(), Venue.featured.desc(), Venue.price_from.asc()).limit(8).all()
\ No newline at end of file
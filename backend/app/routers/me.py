@@ -1,27 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from ..db import SessionLocal
-from ..models import User, Provider, Act, Package, Media, Availability
+from ..db import get_db  # same dependency as current_user: one session per request
+from ..models import Provider, Act, Package, Media
 from ..schemas import ProviderIn, ProviderOut, PackageIn, MediaIn, AvailabilityIn, ActBase, ActOut
-from ..security import bearer, SECRET_KEY, jwt
+from ..principals import Principal, current_user
+from .. import catalog_cache
+from ..tags import write_tags
+from ..availability import set_availability
+from .. import thumbnails
 router = APIRouter()
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-def current_user(creds=Depends(bearer), db: Session = Depends(get_db)) -> User:
-    if not creds: raise HTTPException(401, "Not authenticated")
-    payload = jwt.decode(creds.credentials, SECRET_KEY, algorithms=["HS256"])
-    u = db.query(User).filter_by(email=payload["sub"]).first()
-    if not u: raise HTTPException(401, "User not found")
-    return u
 @router.get("/me/provider", response_model=ProviderOut)
-def get_provider(user: User = Depends(current_user), db: Session = Depends(get_db)):
+def get_provider(user: Principal = Depends(current_user), db: Session = Depends(get_db)):
     p = db.query(Provider).filter_by(user_id=user.id).first()
     if not p: raise HTTPException(404, "Provider not found")
     return p
 @router.post("/me/provider", response_model=ProviderOut)
-def upsert_provider(body: ProviderIn, user: User = Depends(current_user), db: Session = Depends(get_db)):
+def upsert_provider(body: ProviderIn, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
     p = db.query(Provider).filter_by(user_id=user.id).first()
     if not p:
         p = Provider(user_id=user.id, **body.dict(), status="pending")
@@ -30,14 +24,19 @@ def upsert_provider(body: ProviderIn, user: User = Depends(current_user), db: Se
         for k,v in body.dict().items(): setattr(p,k,v)
     db.commit(); db.refresh(p); return p
 @router.post("/me/acts", response_model=ActOut)
-def create_act(body: ActBase, user: User = Depends(current_user), db: Session = Depends(get_db)):
-    a = Act(**body.dict()); db.add(a); db.commit(); db.refresh(a); return a
+def create_act(body: ActBase, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    a = Act(**body.dict()); db.add(a); db.flush(); write_tags(db, {a.id: a.genres})
+    catalog_cache.bump(db); db.commit(); db.refresh(a); return a
 @router.post("/me/packages")
-def add_package(body: PackageIn, user: User = Depends(current_user), db: Session = Depends(get_db)):
+def add_package(body: PackageIn, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
     p = Package(**body.dict()); db.add(p); db.commit(); return {"ok": True}
 @router.post("/me/media")
-def add_media(body: MediaIn, user: User = Depends(current_user), db: Session = Depends(get_db)):
-    m = Media(**body.dict()); db.add(m); db.commit(); return {"ok": True}
+def add_media(body: MediaIn, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    thumbs = thumbnails.image_fields(db, body.url)
+    m = Media(**body.dict(), **thumbs); db.add(m); db.flush()
+    if not thumbs["thumb_url"]: thumbnails.submit_after_commit(db, body.url, [("media", m.id)])
+    db.commit(); return {"ok": True}
 @router.post("/me/availability")
-def add_availability(body: AvailabilityIn, user: User = Depends(current_user), db: Session = Depends(get_db)):
-    a = Availability(**body.dict()); db.add(a); db.commit(); return {"ok": True}
\ No newline at end of file
+def add_availability(body: AvailabilityIn, user: Principal = Depends(current_user), db: Session = Depends(get_db)):
+    days = set_availability(db, body.act_id, body.date, body.date_to, body.is_available)
+    db.commit(); return {"ok": True, "days": days}
\ No newline at end of file
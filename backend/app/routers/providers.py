@@ -2,6 +2,7 @@
 from sqlalchemy.orm import Session
 from ..db import get_db
 from ..models import Act, Venue
+from .. import catalog_cache
 
 router = APIRouter(tags=["providers"])
 
@@ -16,7 +17,7 @@ def providers_register(payload: dict, db: Session = Depends(get_db)):
             image_url=payload.get("image_url"),
             capacity=payload.get("capacity"),
         )
-        db.add(v); db.commit(); db.refresh(v)
+        db.add(v); catalog_cache.bump(db); db.commit(); db.refresh(v)
         return {"id": v.id, "type": "venue"}
     else:
         a = Act(
@@ -26,5 +27,5 @@ def providers_register(payload: dict, db: Session = Depends(get_db)):
             price_from=payload.get("price_from"),
             image_url=payload.get("image_url"),
         )
-        db.add(a); db.commit(); db.refresh(a)
+        db.add(a); catalog_cache.bump(db); db.commit(); db.refresh(a)
         return {"id": a.id, "type": "act"}
@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 from ..db import SessionLocal
 from ..models import Review
+from ..pagination import MAX_LIMIT, paginate
 from ..schemas import ReviewBase, ReviewOut
+from ..serializers import JSONBytes, review_to_dict
 router = APIRouter()
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
-@router.get("/reviews", response_model=list[ReviewOut])
-def list_reviews(act_id: Optional[int] = None, venue_id: Optional[int] = None, db: Session = Depends(get_db)):
+@router.get("/reviews")
+def list_reviews(act_id: Optional[int] = None, venue_id: Optional[int] = None,
+                 limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None,
+                 db: Session = Depends(get_db)):
     q = db.query(Review).filter(Review.status=="visible")
     if act_id: q = q.filter(Review.act_id==act_id)
     if venue_id: q = q.filter(Review.venue_id==venue_id)
-    return q.order_by(Review.id.desc()).all()
+    if limit is not None or cursor:
+        rows, next_cursor = paginate(q, [(Review.id, True)], limit, cursor)
+        return JSONBytes({"items": [review_to_dict(r) for r in rows], "next_cursor": next_cursor})
+    return JSONBytes([review_to_dict(r) for r in q.order_by(Review.id.desc()).all()])
 @router.post("/reviews", response_model=ReviewOut)
 def create_review(body: ReviewBase, db: Session = Depends(get_db)):
     r = Review(**body.dict(), status="visible")
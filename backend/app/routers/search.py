@@ -1,23 +1,28 @@
-﻿from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from ..db import get_db
+﻿from fastapi import APIRouter, Query
+from ..db import run_read
 from ..models import Act, Venue
+from ..fulltext import apply_search
+from ..pagination import ACT_SORT, VENUE_SORT, order_by
 
 router = APIRouter(tags=["search"])
 
+def _ranked(db, model, q, sort, limit=48):
+    query = db.query(model)
+    if q:
+        query, sort = apply_search(query, model, q, sort)
+    return query.order_by(*order_by(sort)).limit(limit).all()
+
 @router.get("/search")
-def search(q: str = Query("", alias="q"), type: str = Query("all"), db: Session = Depends(get_db)):
-    qs = f"%{q.lower()}%"
+async def search(q: str = Query("", alias="q"), type: str = Query("all")):
+    return await run_read(_search, q, type)
+
+def _search(db, q, type):
     acts, venues = [], []
     if type in ("all","acts"):
-        acts = db.query(Act).filter(
-            (Act.name.ilike(qs)) | (Act.location.ilike(qs)) | (Act.genre.ilike(qs))
-        ).limit(48).all()
+        acts = _ranked(db, Act, q, ACT_SORT)
     if type in ("all","venues"):
-        venues = db.query(Venue).filter(
-            (Venue.name.ilike(qs)) | (Venue.location.ilike(qs))
-        ).limit(48).all()
-    def A(a): return {"id":a.id,"name":a.name,"location":a.location,"genre":getattr(a,"genre",None),
+        venues = _ranked(db, Venue, q, VENUE_SORT)
+    def A(a): return {"id":a.id,"name":a.name,"location":a.location,"genre":getattr(a,"genres",None),
                       "price_from":getattr(a,"price_from",None),"image_url":getattr(a,"image_url",None),"rating":getattr(a,"rating",None)}
     def V(v): return {"id":v.id,"name":v.name,"location":v.location,"capacity":getattr(v,"capacity",None),
                       "price_from":getattr(v,"price_from",None),"image_url":getattr(v,"image_url",None)}
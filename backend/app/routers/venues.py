@@ -1,23 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
+from sqlalchemy import func, false, literal_column
 from ..db import SessionLocal
 from ..models import Venue
-from ..schemas import VenueOut
+from ..schemas import VenueOut, VenuePage
+from ..fulltext import apply_search
+from ..filters import contains
+from ..pagination import paginate, order_by, MAX_LIMIT
 router = APIRouter()
+# premium/featured first, then cheapest with unpriced venues last
+SORT = [(func.coalesce(Venue.premium, false()), True), (func.coalesce(Venue.featured, false()), True),
+        (Venue.price_from.is_(None), False), (func.coalesce(Venue.price_from, literal_column("0")), False), (Venue.id, False)]
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
-@router.get("/venues", response_model=List[VenueOut])
-def list_venues(q: Optional[str] = None, location: Optional[str] = None, style: Optional[str] = None, min_price: Optional[float] = Query(None, ge=0), max_price: Optional[float] = Query(None, ge=0), db: Session = Depends(get_db)):
+@router.get("/venues", response_model=Union[List[VenueOut], VenuePage])
+def list_venues(q: Optional[str] = None, location: Optional[str] = None, style: Optional[str] = None, min_price: Optional[float] = Query(None, ge=0), max_price: Optional[float] = Query(None, ge=0), limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT), cursor: Optional[str] = None, db: Session = Depends(get_db)):
     query = db.query(Venue)
-    if q: query = query.filter(Venue.name.ilike(f"%{q}%") | Venue.amenities.ilike(f"%{q}%"))
-    if location: query = query.filter(Venue.location.ilike(f"%{location}%"))
+    sort = SORT
+    if q: query, sort = apply_search(query, Venue, q, sort)
+    if location: query = query.filter(contains(Venue.location, location))
     if style: query = query.filter(Venue.style == style)
     if min_price is not None: query = query.filter(Venue.price_from >= min_price)
     if max_price is not None: query = query.filter(Venue.price_from <= max_price)
-    return query.order_by(Venue.premium.desc(), Venue.featured.desc(), Venue.price_from.asc().nullslast()).all()
+    if limit is not None or cursor:
+        items, next_cursor = paginate(query, sort, limit, cursor)
+        return {"items": items, "next_cursor": next_cursor}
+    return query.order_by(*order_by(sort)).all()
 @router.get("/venues/{slug}", response_model=VenueOut)
 def get_venue(slug: str, db: Session = Depends(get_db)):
     v = db.query(Venue).filter(Venue.slug == slug).first()
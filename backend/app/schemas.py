@@ -1,5 +1,6 @@
+import datetime
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, List
 class Token(BaseModel): access_token: str; token_type: str="bearer"
 class LoginRequest(BaseModel): email: str; password: str
 class ProviderIn(BaseModel):
@@ -14,23 +15,27 @@ class BusinessOut(BusinessIn):
     class Config: from_attributes=True
 class ActBase(BaseModel):
     name: str; act_type: str; location: str
-    price_from: Optional[float]=None; rating: Optional[float]=None; genres: Optional[str]=None; image_url: Optional[str]=None
+    price_from: Optional[float]=None; genres: Optional[str]=None; image_url: Optional[str]=None
     video_url: Optional[str]=None; description: Optional[str]=None; slug: Optional[str]=None; featured: Optional[bool]=False; premium: Optional[bool]=False
 class ActOut(ActBase):
-    id: int
+    id: int; rating: Optional[float]=None; review_count: int=0
     class Config: from_attributes=True
+class ActPage(BaseModel):
+    items: List[ActOut]; next_cursor: Optional[str]=None
 class VenueBase(BaseModel):
     name: str; location: str; capacity: Optional[int]=None; price_from: Optional[float]=None; style: Optional[str]=None
     image_url: Optional[str]=None; amenities: Optional[str]=None; slug: Optional[str]=None; featured: Optional[bool]=False; premium: Optional[bool]=False
 class VenueOut(VenueBase):
-    id: int
+    id: int; rating: Optional[float]=None; review_count: int=0
     class Config: from_attributes=True
+class VenuePage(BaseModel):
+    items: List[VenueOut]; next_cursor: Optional[str]=None
 class PackageIn(BaseModel):
     act_id: int; name: str; price: float; duration_mins: Optional[int]=None; description: Optional[str]=None
 class MediaIn(BaseModel):
     act_id: int; url: str; media_type: Optional[str]="image"; sort: Optional[int]=0
 class AvailabilityIn(BaseModel):
-    act_id: int; date: str; is_available: bool=True
+    act_id: int; date: datetime.date; date_to: Optional[datetime.date]=None; is_available: bool=True
 class BookingBase(BaseModel):
     customer_name: str; customer_email: EmailStr; date: str; message: Optional[str]=None; act_id: Optional[int]=None; venue_id: Optional[int]=None
 class BookingOut(BookingBase):
@@ -2,7 +2,10 @@ import os, datetime, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b", bcrypt__truncate_error=False)
+# hashes below BCRYPT_ROUNDS are upgraded on the next successful login (password_pool)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b", bcrypt__truncate_error=False,
+                           bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS)
 SECRET_KEY = os.getenv("SECRET_KEY","change_me")
 def get_password_hash(p): return pwd_context.hash(p)
 def verify_password(p,h): return pwd_context.verify(p,h)
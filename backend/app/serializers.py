@@ -0,0 +1,181 @@
+import json, os
+from decimal import Decimal
+from operator import attrgetter
+from fastapi.responses import Response
+from sqlalchemy import String, case, cast, func, literal
+from sqlalchemy.orm import load_only, with_expression
+from .models import Act, Venue
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback; same output, just slower
+    orjson = None
+
+# PUBLIC_API_URL makes API-relative links (/api/media/..., /api/acts/1/image)
+# absolute when the frontend is served from another origin.
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", "").rstrip("/")
+
+def public_url(url, base=None):
+    """Absolute link for an API-relative url; `base` (the request's base URL) when PUBLIC_API_URL is unset."""
+    prefix = PUBLIC_API_URL or (base or "").rstrip("/")
+    return f"{prefix}{url}" if url and url.startswith("/api/") else url
+
+def srcset(value, base=None):
+    """
+    thumb_srcset column (JSON {content_type: [[width, url], ...]}, see
+    thumbnails.py) -> {content_type: "url 400w, url 800w, ..."}, or None.
+    """
+    if not value:
+        return None
+    try:
+        variants = json.loads(value)
+    except ValueError:
+        return None
+    return {ct: ", ".join(f"{public_url(url, base)} {width}w" for width, url in rows) for ct, rows in variants.items()}
+
+# Fast JSON.
+# Endpoints that return large lists build their payload with the row encoders
+# below (one attrgetter call per row instead of a getattr per field) and return
+# JSONBytes(...), which is encoded once by orjson and bypasses FastAPI's
+# jsonable_encoder pass. datetimes are written as ISO 8601, like isoformat().
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else _default(o),
+                          separators=(",", ":"), ensure_ascii=False).encode()
+
+class Raw(bytes):
+    """Already-encoded JSON, embedded as-is by envelope()."""
+
+def json_array(parts) -> Raw:
+    """Join already-encoded JSON values into an array."""
+    return Raw(b"[" + b",".join(parts) + b"]")
+
+def envelope(**fields) -> bytes:
+    """Encode an object whose values may be Raw fragments (e.g. cached item arrays)."""
+    return b"{" + b",".join(
+        dumps(k) + b":" + (v if isinstance(v, Raw) else dumps(v)) for k, v in fields.items()
+    ) + b"}"
+
+class JSONBytes(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content if isinstance(content, bytes) else dumps(content)
+
+def row_encoder(fields, **transforms):
+    """
+    Compile a row -> dict converter for a fixed field list.
+    transforms maps a field to a function applied to its value.
+    """
+    fields = tuple(fields)
+    get = attrgetter(*fields)
+    if not transforms:
+        return lambda row: dict(zip(fields, get(row)))
+    def encode(row):
+        d = dict(zip(fields, get(row)))
+        for f, fn in transforms.items():
+            d[f] = fn(d[f])
+        return d
+    return encode
+
+def mapping_rows(result):
+    """Result of a text() query -> list of dicts, keys resolved once."""
+    keys = tuple(result.keys())
+    return [dict(zip(keys, r)) for r in result]
+
+ACT_FIELDS = ("id", "slug", "name", "act_type", "location", "price_from", "rating", "review_count", "genres",
+              "image_url", "thumb_srcset", "video_url", "description", "featured", "premium")
+VENUE_FIELDS = ("id", "slug", "name", "location", "capacity", "price_from", "rating", "review_count", "style",
+                "image_url", "thumb_srcset", "amenities", "featured", "premium")
+BOOKING_FIELDS = ("id", "customer_name", "customer_email", "date", "message", "act_id", "venue_id", "created_at")
+REVIEW_FIELDS = ("id", "author_name", "rating", "comment", "act_id", "venue_id", "status", "response", "created_at")
+
+_act_row = row_encoder(ACT_FIELDS, image_url=public_url, thumb_srcset=srcset)
+_venue_row = row_encoder(VENUE_FIELDS, image_url=public_url, thumb_srcset=srcset)
+booking_to_dict = row_encoder(BOOKING_FIELDS)
+review_to_dict = row_encoder(REVIEW_FIELDS)
+
+def submission_to_dict(row, base=None):
+    """
+    Submission row (mapping) with its payload decoded. Payloads store media as
+    API-relative /api/media/<hash> references; image_url is made absolute here.
+    """
+    d = dict(row)
+    try:
+        payload = json.loads(d.get("payload_json") or "{}")
+    except ValueError:
+        payload = {}
+    if isinstance(payload, dict) and payload.get("image_url"):
+        payload["image_url"] = public_url(payload["image_url"], base)
+    d["payload"] = payload
+    return d
+
+def act_to_dict(a: Act):
+    if not a:
+        return None
+    d = _act_row(a)
+    d["image_srcset"] = d.pop("thumb_srcset")
+    return d
+
+def venue_to_dict(v: Venue):
+    if not v:
+        return None
+    d = _venue_row(v)
+    d["image_srcset"] = d.pop("thumb_srcset")
+    d["description"] = ""  # venues have no description column; kept for API compatibility
+    return d
+
+# Card (list) projections.
+# Listings never load description/video_url/amenities or inline image blobs.
+# image_url on a card is the smallest generated thumbnail when there is one,
+# else the stored URL, or a link to the per-row image endpoint when the stored
+# value is a base64 data: URL. image_srcset lists every generated width per
+# format ({"image/webp": "... 400w, ... 800w, ...", "image/jpeg": ...}), or null.
+ACT_CARD_COLUMNS = ("id", "slug", "name", "act_type", "location", "price_from", "rating", "review_count",
+                    "genres", "featured", "premium", "thumb_srcset")
+VENUE_CARD_COLUMNS = ("id", "slug", "name", "location", "capacity", "price_from", "rating", "review_count",
+                      "style", "featured", "premium", "thumb_srcset")
+
+def _head(column):
+    # first 5 characters only: Postgres fetches just that slice of a TOASTed
+    # multi-MB data: URL, where LIKE would detoast the whole value (substr, not
+    # left(), so SQLite runs it too)
+    return func.substr(column, 1, 5)
+
+def card_options(model):
+    """Query options that load only the card columns plus the computed image_ref."""
+    if model is Act:
+        cols, prefix = ACT_CARD_COLUMNS, f"{PUBLIC_API_URL}/api/acts/"
+    else:
+        cols, prefix = VENUE_CARD_COLUMNS, f"{PUBLIC_API_URL}/api/venues/"
+    ref = case(
+        (model.thumb_url.isnot(None), literal(PUBLIC_API_URL) + model.thumb_url),
+        (_head(model.image_url) == "data:", literal(prefix) + cast(model.id, String) + literal("/image")),
+        (_head(model.image_url) == "/api/", literal(PUBLIC_API_URL) + model.image_url),
+        else_=model.image_url,
+    )
+    return [load_only(*[getattr(model, c) for c in cols]), with_expression(model.image_ref, ref)]
+
+_act_card_row = row_encoder(ACT_CARD_COLUMNS + ("image_ref",), thumb_srcset=srcset)
+_venue_card_row = row_encoder(VENUE_CARD_COLUMNS + ("image_ref",), thumb_srcset=srcset)
+
+def _card(encode, row):
+    d = encode(row)
+    d["image_url"] = d.pop("image_ref") or ""
+    d["image_srcset"] = d.pop("thumb_srcset")
+    return d
+
+def act_card(a: Act):
+    return _card(_act_card_row, a) if a else None
+
+def venue_card(v: Venue):
+    return _card(_venue_card_row, v) if v else None
@@ -0,0 +1,94 @@
+from sqlalchemy import func, select, text
+from .models import Act, ActTag, Tag
+
+# Normalized genre tags.
+# Act.genres stays as the display string ("Pop,Rock,Indie"); tags/act_tags hold
+# the same genres one row per (act, tag) so genre filters are exact, indexed
+# joins instead of LIKE scans ("rock" no longer matches "Rockabilly").
+# Tags are keyed by slug = lower-cased, trimmed name.
+
+def split_genres(genres):
+    """'Pop, rock,,Pop' -> {'pop': 'Pop', 'rock': 'rock'} (slug -> first display name)."""
+    out = {}
+    for part in (genres or "").split(","):
+        name = part.strip()[:80]
+        if name and name.lower() not in out:
+            out[name.lower()] = name
+    return out
+
+def ensure_tag_tables(db):
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(80) NOT NULL,
+            slug VARCHAR(80) NOT NULL UNIQUE
+        )
+    """))
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS act_tags (
+            act_id INTEGER NOT NULL REFERENCES acts(id) ON DELETE CASCADE,
+            tag_id INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+            PRIMARY KEY (act_id, tag_id)
+        )
+    """))
+    # PK covers act -> tags; this covers tag -> acts
+    db.execute(text("CREATE INDEX IF NOT EXISTS ix_act_tags_tag ON act_tags (tag_id, act_id)"))
+
+def backfill_tags(db, batch=1000):
+    """Tag every act that has genres but no act_tags rows yet. Safe to re-run."""
+    after = 0
+    while True:
+        rows = db.execute(text("""
+            SELECT a.id, a.genres FROM acts a
+            WHERE a.id > :after AND COALESCE(a.genres, '') <> ''
+              AND NOT EXISTS (SELECT 1 FROM act_tags t WHERE t.act_id = a.id)
+            ORDER BY a.id LIMIT :n
+        """), {"after": after, "n": batch}).all()
+        write_tags(db, {r[0]: r[1] for r in rows})
+        if len(rows) < batch:
+            return
+        after = rows[-1][0]
+
+def write_tags(db, genres_by_act, replace=False):
+    """
+    Set tags for many acts at once: {act_id: "Pop,Rock"}.
+    Upserts unknown tags in one statement and inserts the join rows in one
+    executemany. With replace=True existing tags for those acts are dropped first.
+    Returns the number of act_tags rows written.
+    """
+    if not genres_by_act:
+        return 0
+    parsed = {act_id: split_genres(g) for act_id, g in genres_by_act.items()}
+    names = {}
+    for tags in parsed.values():
+        for slug, name in tags.items():
+            names.setdefault(slug, name)
+    if replace:
+        db.execute(ActTag.__table__.delete().where(ActTag.act_id.in_(list(parsed))))
+    if not names:
+        return 0
+    db.execute(
+        text("INSERT INTO tags (name, slug) VALUES (:name, :slug) ON CONFLICT (slug) DO NOTHING"),
+        [{"name": n, "slug": s} for s, n in names.items()],
+    )
+    ids = dict(db.execute(select(Tag.slug, Tag.id).where(Tag.slug.in_(list(names)))).all())
+    pairs = [
+        {"act_id": act_id, "tag_id": ids[slug]}
+        for act_id, tags in parsed.items() for slug in tags if slug in ids
+    ]
+    if pairs:
+        db.execute(text("INSERT INTO act_tags (act_id, tag_id) VALUES (:act_id, :tag_id) ON CONFLICT DO NOTHING"), pairs)
+    return len(pairs)
+
+def genre_filter(genres, match="any"):
+    """
+    WHERE clause on Act.id for a comma-separated genre list.
+    match="any": act has at least one of the genres; "all": it has every one.
+    """
+    slugs = list(split_genres(genres))
+    if not slugs:
+        return None
+    sub = select(ActTag.act_id).join(Tag, Tag.id == ActTag.tag_id).where(Tag.slug.in_(slugs))
+    if match == "all" and len(slugs) > 1:
+        sub = sub.group_by(ActTag.act_id).having(func.count() == len(slugs))
+    return Act.id.in_(sub)
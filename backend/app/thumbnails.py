@@ -0,0 +1,174 @@
+import io, json, multiprocessing, os, queue, threading, traceback
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import bindparam, event, inspect, text
+from . import catalog_cache
+from .db import SessionLocal
+from .media_store import MEDIA_PREFIX, blob_path, media_url, store_bytes
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: without Pillow, images are served as uploaded
+    Image = None
+
+# Background thumbnail pipeline.
+# Whenever an image lands in the media store, submit(url) resizes it in a
+# process pool (forkserver, so workers never inherit the API's threads and
+# locks) to fixed widths as WebP and JPEG. A single saver thread takes the
+# finished renders off a queue, stores each variant in the media store and
+# records it in media_variants, then updates the rows passed as `targets` by
+# id: thumb_url gets the smallest WebP, and thumb_srcset the full variant set
+# (serialized as srcset strings, see serializers.srcset). Rows created later
+# (e.g. on approval) copy existing variants with image_fields(), or queue a
+# render with submit_after_commit() so the saver never races their INSERT.
+
+WIDTHS = (400, 800, 1200)
+FORMATS = (("WEBP", "image/webp"), ("JPEG", "image/jpeg"))
+WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_results = queue.Queue()
+_saver = None
+
+def ensure_variant_table(db):
+    db.execute(text("""
+        CREATE TABLE IF NOT EXISTS media_variants (
+            source_hash VARCHAR(64) NOT NULL,
+            width INTEGER NOT NULL,
+            content_type VARCHAR(100) NOT NULL,
+            variant_hash VARCHAR(64) NOT NULL,
+            PRIMARY KEY (source_hash, width, content_type)
+        )
+    """))
+    # media (and, on a fresh database, acts/venues) may not exist: nothing creates them here
+    existing = set(inspect(db.connection()).get_table_names())
+    for table in ("acts", "venues", "media"):
+        if table not in existing:
+            continue
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS thumb_url TEXT"))
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS thumb_srcset TEXT"))
+
+def _source_hash(url):
+    if url and url.startswith(MEDIA_PREFIX):
+        return url[len(MEDIA_PREFIX):]
+    return None
+
+def render(path, widths=WIDTHS):
+    """Worker-process side: [(width, content_type, bytes)] for each width/format. Never upscales."""
+    out = []
+    with Image.open(path) as im:
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        sizes = sorted({min(w, im.width) for w in widths})
+        for w in sizes:
+            h = max(1, round(im.height * w / im.width))
+            resized = im if w == im.width else im.resize((w, h), Image.LANCZOS)
+            for fmt, content_type in FORMATS:
+                buf = io.BytesIO()
+                resized.save(buf, fmt, quality=80)
+                out.append((w, content_type, buf.getvalue()))
+    return out
+
+def _fields(rows):
+    """[(width, content_type, variant_hash)] -> {"thumb_url", "thumb_srcset"} for one source image."""
+    rows = sorted(rows)
+    webp = [r for r in rows if r[1] == "image/webp"]
+    srcset = {}
+    for width, content_type, vh in rows:
+        srcset.setdefault(content_type, []).append([width, media_url(vh)])
+    return {
+        "thumb_url": media_url(webp[0][2]) if webp else None,
+        "thumb_srcset": json.dumps(srcset, separators=(",", ":")) if srcset else None,
+    }
+
+def images_fields(db, urls):
+    """{url: {"thumb_url", "thumb_srcset"}} for the media-store URLs that have variants, in one query."""
+    by_hash = {h: u for u in set(urls) if (h := _source_hash(u))}
+    if not by_hash:
+        return {}
+    found = {}
+    for h, width, content_type, vh in db.execute(text("""
+        SELECT source_hash, width, content_type, variant_hash FROM media_variants WHERE source_hash IN :hashes
+    """).bindparams(bindparam("hashes", expanding=True)), {"hashes": list(by_hash)}):
+        found.setdefault(h, []).append((width, content_type, vh))
+    return {by_hash[h]: _fields(rows) for h, rows in found.items()}
+
+def image_fields(db, url):
+    """thumb_url / thumb_srcset values for a row using `url` (both None until variants exist)."""
+    return images_fields(db, [url]).get(url) or {"thumb_url": None, "thumb_srcset": None}
+
+def thumb_for(db, url):
+    """Smallest recorded WebP variant of a media-store URL, or None."""
+    return image_fields(db, url)["thumb_url"]
+
+def _save(h, variants, targets):
+    with SessionLocal() as db:
+        rows = []
+        for width, content_type, data in variants:
+            vh = _source_hash(store_bytes(db, data, content_type))
+            db.execute(text("""
+                INSERT INTO media_variants (source_hash, width, content_type, variant_hash)
+                VALUES (:h, :w, :ct, :v) ON CONFLICT DO NOTHING
+            """), {"h": h, "w": width, "ct": content_type, "v": vh})
+            rows.append((width, content_type, vh))
+        fields = _fields(rows)
+        by_table = {}
+        for table, row_id in targets:
+            by_table.setdefault(table, []).append(row_id)
+        for table, ids in by_table.items():
+            db.execute(text(f"UPDATE {table} SET thumb_url = :t, thumb_srcset = :s WHERE id IN :ids")
+                       .bindparams(bindparam("ids", expanding=True)),
+                       {"t": fields["thumb_url"], "s": fields["thumb_srcset"], "ids": ids})
+        if by_table.keys() & {"acts", "venues"}:
+            catalog_cache.bump(db)
+        db.commit()
+
+def _save_loop():
+    while True:
+        job = _results.get()
+        if job is None:
+            return
+        h, future, targets = job
+        try:
+            _save(h, future.result(), targets)
+        except Exception:
+            print(f"⚠️  Thumbnail generation failed for {h}")
+            traceback.print_exc()
+
+def submit(url, db=None, targets=()):
+    """
+    Queue variant generation for a media-store URL; `targets` are (table, id)
+    rows (acts/venues/media) to update when it's done. No-op for external
+    URLs, without Pillow, or (when `db` is given) if variants already exist.
+    """
+    global _pool, _saver
+    h = _source_hash(url)
+    if not h or Image is None or not os.path.exists(blob_path(h)):
+        return None
+    if db is not None and thumb_for(db, url):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        if _saver is None:
+            _saver = threading.Thread(target=_save_loop, name="thumbnail-saver", daemon=True)
+            _saver.start()
+    future = _pool.submit(render, blob_path(h))
+    targets = tuple(targets)
+    # runs on the pool's result thread: only hand over, the saver thread does the I/O
+    future.add_done_callback(lambda f: _results.put((h, f, targets)))
+    return future
+
+def submit_after_commit(db, url, targets):
+    """submit() once `db` commits, so the target rows exist when the saver updates them."""
+    event.listen(db, "after_commit", lambda session: submit(url, targets=targets), once=True)
+
+def shutdown():
+    global _pool, _saver
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        if _saver is not None:
+            _results.put(None)  # after the pool drained, so pending saves finish first
+            _saver.join(timeout=30)
+            _saver = None
@@ -0,0 +1,181 @@
+import json, os, tempfile
+from urllib.parse import parse_qsl
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+from .media_store import BlobWriter, store_data_url
+
+# Size-bounded request body ingestion for public upload endpoints.
+# Bodies are read from request.stream() chunk by chunk and never buffered
+# whole: multipart file parts go straight into the media store (hashed while
+# they stream), text fields are capped at UPLOAD_MAX_FIELD_BYTES, and the whole
+# body at UPLOAD_MAX_BYTES. A declared Content-Length over the limit is
+# rejected before anything is read. An inline data: image_url in a JSON or
+# urlencoded submission goes through the media store too, so no encoding can
+# put a blob into a table row.
+
+MAX_BODY = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+MAX_FILE = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(8 * 1024 * 1024)))
+MAX_FIELD = int(os.getenv("UPLOAD_MAX_FIELD_BYTES", str(64 * 1024)))
+MAX_PARTS = 50
+
+def _too_large(what="Request body"):
+    return HTTPException(413, f"{what} too large")
+
+def check_length(request: Request, limit=MAX_BODY):
+    try:
+        declared = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(400, "Invalid Content-Length")
+    if declared > limit:
+        raise _too_large()
+
+async def read_limited(request: Request, limit: int) -> bytes:
+    """Whole body for small (JSON / urlencoded) requests, failing fast past `limit`."""
+    check_length(request, limit)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise _too_large()
+    return bytes(body)
+
+async def spool_body(request: Request, limit: int, memory=8 * 1024 * 1024):
+    """Large bodies (bulk imports): streamed into a temp file that spills to disk past `memory`."""
+    check_length(request, limit)
+    spool, size = tempfile.SpooledTemporaryFile(max_size=memory), 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                raise _too_large()
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+class _Part:
+    def __init__(self):
+        self.headers, self.name, self.content_type = {}, None, None
+        self.data, self.writer = bytearray(), None
+
+async def parse_multipart(request: Request, db, file_fields=("image",)):
+    """
+    Stream a multipart/form-data body. Returns (fields, files): text fields as
+    str, and for each file field in `file_fields` its /api/media URL.
+    Other file parts and non-image uploads are rejected.
+    """
+    check_length(request)
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise HTTPException(400, "Missing multipart boundary")
+
+    fields, files, writers = {}, {}, []
+    state = {"part": None, "header": b"", "value": b"", "parts": 0}
+
+    def on_part_begin():
+        state["parts"] += 1
+        if state["parts"] > MAX_PARTS:
+            raise HTTPException(413, "Too many form fields")
+        state["part"] = _Part()
+
+    def on_header_field(data, start, end):
+        state["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["part"].headers[state["header"].lower()] = state["value"]
+        state["header"] = state["value"] = b""
+
+    def on_headers_finished():
+        part = state["part"]
+        _, opts = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.name = opts.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in opts:
+            part.content_type = part.headers.get(b"content-type", b"").decode("latin-1").strip()
+            if part.name not in file_fields:
+                raise HTTPException(400, f"Unexpected file field '{part.name}'")
+            if not part.content_type.startswith("image/"):
+                raise HTTPException(415, "Only image uploads are accepted")
+            part.writer = BlobWriter()
+            writers.append(part.writer)
+
+    def on_part_data(data, start, end):
+        part = state["part"]
+        if part.writer is not None:
+            if part.writer.size + (end - start) > MAX_FILE:
+                raise _too_large("File")
+            part.writer.write(data[start:end])
+        else:
+            part.data += data[start:end]
+            if len(part.data) > MAX_FIELD:
+                raise _too_large(f"Field '{part.name}'")
+
+    def on_part_end():
+        part = state["part"]
+        if part.writer is not None:
+            if part.writer.size:
+                files[part.name] = part.writer.finish(db, part.content_type)
+            else:
+                part.writer.abort()  # empty file input
+        else:
+            fields[part.name] = part.data.decode("utf-8", "replace")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_part_data": on_part_data, "on_part_end": on_part_end,
+        "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_headers_finished": on_headers_finished,
+    })
+    total = 0
+    try:
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > MAX_BODY:
+                raise _too_large()
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException:
+        for w in writers:
+            w.abort()
+        raise
+    return fields, files
+
+def _inline_image(data: dict, db):
+    """Move an inline data: image_url into the media store, as if it had been uploaded."""
+    value = data.get("image_url")
+    if not isinstance(value, str) or not value.startswith("data:"):
+        return {}
+    if not value[5:].split(",", 1)[0].split(";")[0].strip().lower().startswith("image/"):
+        raise HTTPException(415, "Only image uploads are accepted")
+    try:
+        url = store_data_url(db, value)
+    except ValueError:  # no payload separator or bad base64
+        raise HTTPException(400, "Invalid image data URL")
+    del data["image_url"]
+    return {"image": url}
+
+async def read_submission(request: Request, db):
+    """
+    Parse a provider submission sent as JSON, urlencoded or multipart form.
+    Returns (data, files) with the same bounds for every encoding; an inline
+    data: image_url is stored and reported in files like a multipart upload.
+    """
+    ct = (request.headers.get("content-type") or "").lower()
+    if "multipart/form-data" in ct:
+        return await parse_multipart(request, db)
+    raw = await read_limited(request, MAX_FIELD * 4)
+    if "application/json" in ct:
+        try:
+            data = json.loads(raw or b"{}")
+        except ValueError:
+            data = {}  # permissive, like the form path
+        data = data if isinstance(data, dict) else {}
+        return data, _inline_image(data, db)
+    if "application/x-www-form-urlencoded" in ct:
+        data = dict(parse_qsl(raw.decode("utf-8", "replace"), keep_blank_values=True))
+        return data, _inline_image(data, db)
+    return {}, {}